@@ -0,0 +1,126 @@
+#!/usr/bin/python3
+
+import argparse
+import concurrent.futures
+import json
+import random
+import sys
+import time
+
+import board
+import compact
+import positions
+
+def readDeal( filename ):
+    """A deal task for a deck file."""
+    with open( filename, "r" ) as deckFile:
+        return ( filename, board.parseDeck( deckFile.read() ), )
+
+def shuffledDeal( seed ):
+    """A deal task for a deck shuffled by a seeded generator."""
+    deck = [*range(0,52)]
+    random.Random( seed ).shuffle( deck )
+    return ( seed, deck, )
+
+#   Each process maps the position database files once
+databases = {}
+
+def openPositions( path ):
+    """Map an existing position database file (see solveDeals)."""
+    if path not in databases:
+        databases[path] = positions.PositionDatabase( path, create = False )
+    return databases[path]
+
+def solveDeal( deal, improvements = 1, maxNodes = None, maxSeconds = None, strategy = 'dfs', layout = 'board', positionsPath = None,
+               cells = None, cascades = None ):
+    """Solve one deal within the node and time limits
+    and summarise the result as a dictionary.
+    Depth first searches can share what they learn about positions
+    with the other deals through a position database file.
+    Position keys don't depend on the number of cells,
+    so each variant of the game needs its own database.
+
+    The status is 'solved', 'unsolvable' (the search finished without a solution)
+    or the limit that stopped the search ('nodes' or 'seconds')."""
+    name, deck = deal
+    b = ( compact.CompactBoard if layout == 'compact' else board.Board )( deck, cells = cells, cascades = cascades )
+
+    found = 0
+    start = time.perf_counter()
+
+    #   Only called when a shorter solution is found
+    def callback( **kwargs ):
+        nonlocal found
+        found += 1
+        return found < improvements
+
+    database = openPositions( positionsPath ) if positionsPath else None
+    solution = b.solve( callback, strategy = strategy, maxNodes = maxNodes, maxSeconds = maxSeconds, callbackEvery = 0, positions = database )
+    stats = b.searchStats()
+
+    if solution: status = 'solved'
+    elif stats['stopped']: status = stats['stopped']
+    else: status = 'unsolvable'
+
+    return {
+        'deal': name,
+        'deck': ' '.join( board.formatCard( card ) for card in deck ),
+        'status': status,
+        'solvable': True if solution else ( False if status == 'unsolvable' else None ),
+        'length': len(solution) if solution else None,
+        'nodes': stats['nodes'],
+        'seconds': round( time.perf_counter() - start, 6 ),
+    }
+
+def solveDeals( deals, jobs = None, chunksize = 1, **options ):
+    """Solve the deals in worker processes, yielding the results in the order of the deals.
+    A new position database file is created here, so the workers don't race to create it."""
+    if options.get( 'positionsPath' ):
+        positions.PositionDatabase( options['positionsPath'] ).close()
+    with concurrent.futures.ProcessPoolExecutor( max_workers = jobs ) as executor:
+        for result in executor.map( _solveDeal, ( ( deal, options, ) for deal in deals ), chunksize = chunksize ):
+            yield result
+
+def _solveDeal( task ):
+    deal, options = task
+    return solveDeal( deal, **options )
+
+def run( deals, output, jobs = None, chunksize = 1, **options ):
+    """Solve the deals and write the results to the output as JSON lines.
+    Returns the number of deals solved."""
+    solved = 0
+    for result in solveDeals( deals, jobs, chunksize, **options ):
+        output.write( json.dumps( result ) )
+        output.write( '\n' )
+        output.flush()
+        solved += ( result['status'] == 'solved' )
+    return solved
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Solves Baker's Game deals in parallel and writes the results as JSON lines")
+    parser.add_argument( 'files', metavar='file', type=str, nargs='*', help="Deck files to solve.")
+    parser.add_argument( '-n', '--deals', dest='deals', type=int, default=0, help="The number of shuffled deals to solve")
+    parser.add_argument( '--seed', dest='seed', type=int, default=0, help="The seed of the first shuffled deal")
+    parser.add_argument( '-o', '--output', dest='output', type=str, help="The file to write the results to (default stdout)")
+    parser.add_argument( '-j', '--jobs', dest='jobs', type=int, help="The number of worker processes (default all cores)")
+    parser.add_argument( '-i', '--improve', dest='improvements', type=int, default=1, help="The number of improvements to try when solving")
+    parser.add_argument( '--max-nodes', dest='maxNodes', type=int, help="The number of positions to search per deal")
+    parser.add_argument( '--max-seconds', dest='maxSeconds', type=float, help="The number of seconds to search per deal")
+    parser.add_argument( '-s', '--strategy', dest='strategy', default='dfs', choices=('dfs', 'astar', 'ida',), help="The search strategy")
+    parser.add_argument( '-c', '--compact', dest='compact', action="store_true", help="Solve using the compact board layout")
+    parser.add_argument( '--positions', dest='positions', type=str, help="Share what the depth first searches learn through this position database file")
+    parser.add_argument( '--cells', dest='cells', type=int, choices=range(1, 5), help="The number of cells (default 4)")
+    parser.add_argument( '--cascades', dest='cascades', type=int, choices=range(6, 11), help="The number of cascades (default 8)")
+    args = parser.parse_args()
+
+    deals = [readDeal( filename ) for filename in args.files]
+    deals.extend( shuffledDeal( seed ) for seed in range( args.seed, args.seed + args.deals ) )
+
+    output = open( args.output, "w" ) if args.output else sys.stdout
+    solved = run( deals, output, args.jobs,
+                  improvements = args.improvements, maxNodes = args.maxNodes, maxSeconds = args.maxSeconds,
+                  strategy = args.strategy, layout = 'compact' if args.compact else 'board', positionsPath = args.positions,
+                  cells = args.cells, cascades = args.cascades )
+    if args.output:
+        output.close()
+        print( f"Solved {solved} of {len(deals)} deals" )
@@ -0,0 +1,131 @@
+#!/usr/bin/python3
+
+import argparse
+import glob
+import json
+import sys
+import time
+import tracemalloc
+
+import batch
+import board
+import compact
+import ordering
+
+def benchmarkDeals( fixtures = 'fixtures', deals = 10, seed = 0 ):
+    """The deals to benchmark: every deck file in the fixtures directory,
+    the unshuffled and reversed decks and some seeded shuffled deals."""
+    result = [batch.readDeal( filename ) for filename in sorted( glob.glob( f"{fixtures}/*.txt" ) )]
+    result.append( ( 'unshuffled', [*range(0,52)], ) )
+    result.append( ( 'reversed', [*range(51,-1,-1)], ) )
+    result.extend( ( f"seed{seed}", batch.shuffledDeal( seed )[1], ) for seed in range( seed, seed + deals ) )
+    return result
+
+def benchmark( deal, layout = board.Board, strategy = 'dfs', maxNodes = None, memory = True, repeat = 1, orderer = None ):
+    """Solve a deal and measure the search, keeping the fastest of repeat solves.
+    The peak memory is measured with tracemalloc in a separate solve,
+    so the tracing does not slow down the timed ones.
+    The depth first search orders its moves with the orderer, if any,
+    which is shared by every solve so learning orderers keep what they learn."""
+    name, deck = deal
+
+    seconds = None
+    for attempt in range( repeat ):
+        b = layout( deck )
+        start = time.perf_counter()
+        solution = b.solve( strategy = strategy, maxNodes = maxNodes, orderer = orderer )
+        elapsed = time.perf_counter() - start
+        if seconds is None or elapsed < seconds: seconds = elapsed
+    nodes = b.searchStats()['nodes']
+
+    result = {
+        'deal': name,
+        'length': len(solution),
+        'nodes': nodes,
+        'seconds': seconds,
+        'nodesPerSecond': nodes / seconds if seconds else 0.0,
+    }
+
+    if memory:
+        tracemalloc.start()
+        layout( deck ).solve( strategy = strategy, maxNodes = maxNodes, orderer = orderer )
+        result['peakBytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return result
+
+def compare( results, baseline, tolerance = 0.1, minSeconds = 0.05 ):
+    """Compare results with a baseline and return a list of regressions.
+    Solution lengths must match exactly, while node counts, times and
+    memory may grow by the tolerance fraction. Times under minSeconds
+    in the baseline are too noisy to compare."""
+    previous = { result['deal']: result for result in baseline }
+    regressions = []
+    for result in results:
+        old = previous.get( result['deal'] )
+        if old is None: continue
+
+        name = result['deal']
+        if result['length'] != old['length']:
+            regressions.append( f"{name}: length {old['length']} => {result['length']}" )
+
+        for measure in ( 'nodes', 'seconds', 'peakBytes', ):
+            if measure not in result or measure not in old: continue
+            if measure == 'seconds' and old[measure] < minSeconds: continue
+            if result[measure] > old[measure] * ( 1 + tolerance ):
+                regressions.append( f"{name}: {measure} {old[measure]:g} => {result[measure]:g}" )
+
+    return regressions
+
+def formatResult( result ):
+    memory = f" {result['peakBytes'] / 1024:10.0f}KB" if 'peakBytes' in result else ""
+    return f"{result['deal']:>24} {result['length']:6} {result['nodes']:8} {result['seconds']:8.3f}s {result['nodesPerSecond']:9.0f}/s{memory}"
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks the Baker's Game solver")
+    parser.add_argument( '-n', '--deals', dest='deals', type=int, default=10, help="The number of seeded shuffled deals to solve")
+    parser.add_argument( '--seed', dest='seed', type=int, default=0, help="The seed of the first shuffled deal")
+    parser.add_argument( '--fixtures', dest='fixtures', type=str, default='fixtures', help="The directory of deck files to solve")
+    parser.add_argument( '-s', '--strategy', dest='strategy', default='dfs', choices=('dfs', 'astar', 'ida',), help="The search strategy")
+    parser.add_argument( '-c', '--compact', dest='compact', action="store_true", help="Solve using the compact board layout")
+    parser.add_argument( '--max-nodes', dest='maxNodes', type=int, help="The number of positions to search per deal")
+    parser.add_argument( '-r', '--repeat', dest='repeat', type=int, default=3, help="The number of timed solves per deal, keeping the fastest")
+    parser.add_argument( '--no-memory', dest='memory', action="store_false", help="Don't measure the peak memory")
+    parser.add_argument( '--save', dest='save', type=str, help="Save the results as a baseline JSON file")
+    parser.add_argument( '--compare', dest='compare', type=str, help="Compare the results with a baseline JSON file")
+    parser.add_argument( '--tolerance', dest='tolerance', type=float, default=0.1, help="The fraction nodes, times and memory can grow by")
+    parser.add_argument( '-o', '--order', dest='orders', action='append', choices=ordering.orderers.keys(), help="Order the moves with this orderer (repeat to compare several)")
+    args = parser.parse_args()
+
+    layout = compact.CompactBoard if args.compact else board.Board
+    deals = benchmarkDeals( args.fixtures, args.deals, args.seed )
+    totals = []
+    for order in args.orders or [None]:
+        if order: print( f"Ordering by {order}" )
+        orderer = ordering.makeOrderer( order ) if order else None
+        results = []
+        for deal in deals:
+            results.append( benchmark( deal, layout, args.strategy, args.maxNodes, args.memory, args.repeat, orderer ) )
+            print( formatResult( results[-1] ) )
+            sys.stdout.flush()
+
+        length = sum( result['length'] for result in results )
+        nodes = sum( result['nodes'] for result in results )
+        seconds = sum( result['seconds'] for result in results )
+        totals.append( f"{order or 'Total':>24} {length:6} {nodes:8} {seconds:8.3f}s {nodes / seconds:9.0f}/s" )
+        print( totals[-1] )
+
+    #   Line the orderers up against each other
+    if len(totals) > 1:
+        print( '\n'.join( totals ) )
+
+    if args.save:
+        with open( args.save, "w" ) as baselineFile:
+            json.dump( results, baselineFile, indent = 1 )
+
+    if args.compare:
+        with open( args.compare, "r" ) as baselineFile:
+            regressions = compare( results, json.load( baselineFile ), args.tolerance )
+        for regression in regressions:
+            print( f"Regression {regression}" )
+        if regressions: sys.exit( 1 )
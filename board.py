@@ -1,6 +1,9 @@
 #!/usr/bin/python3
 
-import copy
+import heapq
+import itertools
+import random
+import time
 
 noCard = -1
 
@@ -64,35 +67,230 @@ def isKingStack( cascade ):
 
     return True
 
+#   Zobrist tables are shared by every board with the same key size
+zobristSeed = 0xBA4E25
+zobristTables = {}
+
+def zobristTable( bits = 64 ):
+    """Random keys for each card resting on each possible card
+    (or the bottom of a cascade), indexed by card * 53 + under + 1.
+    The table is seeded so keys are stable between processes."""
+    if bits not in zobristTables:
+        generator = random.Random( zobristSeed + bits )
+        zobristTables[bits] = [generator.getrandbits( bits ) for i in range(52 * 53)]
+    return zobristTables[bits]
+
+def zobristIndex( card, under ):
+    return card * 53 + under + 1
+
+#   Every relabelling of the suits
+suitPermutations = [*itertools.permutations( range(len(suitChars)) )]
+symmetricTables = {}
+
+def relabelCard( card, permutation ):
+    if card == noCard: return noCard
+    return makeCard( permutation[suit( card )], pips( card ) )
+
+def symmetricTable( bits = 64 ):
+    """Zobrist keys for every relabelling of the suits at once.
+    Each entry packs the keys of the card resting on the card under it,
+    with both relabelled by each suit permutation, into one wide number,
+    so the keys of all the relabellings are updated by a single xor."""
+    if bits not in symmetricTables:
+        zobrist = zobristTable( bits )
+        table = []
+        for card in range(52):
+            for under in range(noCard, 52):
+                packed = 0
+                for shift, permutation in enumerate( suitPermutations ):
+                    packed |= zobrist[zobristIndex( relabelCard( card, permutation ), relabelCard( under, permutation ) )] << ( shift * bits )
+                table.append( packed )
+        symmetricTables[bits] = table
+    return symmetricTables[bits]
+
+#   Moves are encoded in a byte as two four bit locations,
+#   offset so the foundations are not negative.
+#   A move from a cell to itself can't happen,
+#   so the last cell is used to mark the ends of turns.
+#   Boards with more than twelve cascades and cells don't fit,
+#   so their solutions start with wideSolution (another move between cells)
+#   and use a byte for each location.
+moveOffset = 4
+endOfTurn = 0xFF
+wideSolution = 0xFE
+
+def isNarrowMove( move ):
+    start, finish = move
+    return -moveOffset <= start < 16 - moveOffset and -moveOffset <= finish < 16 - moveOffset
+
+def encodeMove( move ):
+    assert isNarrowMove( move ), f"Move {move} can't be encoded"
+    start, finish = move
+    return ( start + moveOffset ) << 4 | ( finish + moveOffset )
+
+def decodeMove( code ):
+    return ( ( code >> 4 ) - moveOffset, ( code & 0xF ) - moveOffset, )
+
+def encodeSolution( solution ):
+    """Encode a solution (a list of turns, each a list of moves)
+    as bytes, one per move, with each turn followed by endOfTurn.
+    Solutions that need wide moves use two bytes per move, as do those
+    whose first byte would be wideSolution."""
+    wide = not all( isNarrowMove( move ) for turn in solution for move in turn )
+    wide = wide or ( solution and solution[0] and encodeMove( solution[0][0] ) == wideSolution )
+    encoded = bytearray( [wideSolution] if wide else [] )
+    for turn in solution:
+        if wide:
+            for start, finish in turn:
+                encoded.extend( ( start + moveOffset, finish + moveOffset, ) )
+        else:
+            encoded.extend( encodeMove( move ) for move in turn )
+        encoded.append( endOfTurn )
+    return bytes( encoded )
+
+def decodeSolution( encoded ):
+    """Decode the bytes of encodeSolution into a list of turns."""
+    solution = []
+    turn = []
+    wide = encoded[:1] == bytes( [wideSolution] )
+    codes = iter( encoded[1:] if wide else encoded )
+    for code in codes:
+        if code == endOfTurn:
+            solution.append( turn )
+            turn = []
+        elif wide:
+            turn.append( ( code - moveOffset, next( codes ) - moveOffset, ) )
+        else:
+            turn.append( decodeMove( code ) )
+    assert not turn, "Encoded solution does not end with a complete turn"
+    return solution
+
+class SearchLimits:
+    """The node, time and cancellation limits of a search.
+    The clock and the cancellation token are only read every interval
+    positions, so a search can run a little past its time limit."""
+
+    interval = 256
+
+    def __init__(self, maxNodes = None, maxSeconds = None, cancel = None):
+        self.maxNodes = maxNodes
+        self.deadline = None if maxSeconds is None else time.perf_counter() + maxSeconds
+        self.cancel = cancel
+        self.limited = maxNodes is not None or maxSeconds is not None or cancel is not None
+        self.checkAt = 0
+        self.schedule( 0 )
+
+    def schedule(self, nodes):
+        """Work out when the limits next need checking."""
+        if not self.limited:
+            self.checkAt = float('inf')
+            return
+
+        self.checkAt = nodes + self.interval
+        if self.maxNodes is not None and self.checkAt > self.maxNodes:
+            self.checkAt = self.maxNodes
+
+    def exceeded(self, nodes):
+        """The reason the search should stop after this many positions, or None."""
+        if self.maxNodes is not None and nodes >= self.maxNodes: return 'nodes'
+        if self.deadline is not None and time.perf_counter() >= self.deadline: return 'seconds'
+        if self.cancel is not None and self.cancel.is_set(): return 'cancelled'
+
+        self.schedule( nodes )
+        return None
+
+def sampledTimer( function, every, timings, name ):
+    """Wrap a function to time every so many calls and add
+    an estimate of the total time spent in it to timings[name]."""
+    calls = 0
+    timings[name] = 0.0
+
+    def timed( *args ):
+        nonlocal calls
+        calls += 1
+        if calls % every: return function( *args )
+
+        start = time.perf_counter()
+        result = function( *args )
+        timings[name] += ( time.perf_counter() - start ) * every
+        return result
+
+    return timed
+
 class Board:
-    def __init__(self, deck):
+    __slots__ = ( '_nsuits', '_foundations', '_cells', '_firstFree', '_tableau',
+                  '_memento', '_resort', '_rehash', '_sorted',
+                  '_exact', '_symmetric', '_zobrist', '_key', '_search', '_resorts', '_rehashes',
+                  '_tops', '_openCells', '_empties', '_rules', '_supermoves', )
+
+    #   The safe rules that moveToFoundations can also apply (see safeMoves)
+    safeRules = ( 'cells', 'kings', )
+
+    def __init__(self, deck, exact = False, keyBits = 64, symmetric = False, rules = (), supermoves = False,
+                 cells = None, cascades = None):
         #   How many suits were we given?
         self._nsuits = suit(len(deck))
 
         #   Aces contains the highest pip number for that ace
         self._foundations = self._nsuits * [ noCard ]
 
-        #   Cells contains cards
-        self._cells = self._nsuits * [ noCard ]
+        #   Cells contains cards, one per suit unless we are told otherwise
+        self._cells = ( self._nsuits if cells is None else cells ) * [ noCard ]
         self._firstFree = 0
 
-        #   Columns contains the main board layout
-        self._tableau = [ [] for c in range(self._nsuits * 2) ]
+        #   Columns contains the main board layout,
+        #   two per suit unless we are told otherwise
+        self._tableau = [ [] for c in range(self._nsuits * 2 if cascades is None else cascades) ]
         for d in range(0, len(deck)):
             self._tableau[d % len(self._tableau)].append(deck[d])
 
-        #   We use a hash of the sorted cascades as a memento
+        #   In exact mode we use the sorted cascades as a memento
         #   to avoid looping. Resorting is expensive, so we
         #   try to avoid it by setting a flag when the sort
         #   order becomes invalid. Since cards are unique,
         #   the sort order only changes when the first card
-        #   in a cascade changes. We need to rehash whenever
+        #   in a cascade changes. We need to rebuild whenever
         #   cards move, so that is a separate flag.
         self._memento = None
         self._resort = True
         self._rehash = True
         self._sorted = [cascade for cascade in self._tableau]
 
+        #   Unless we want exact mementos, we use a Zobrist key
+        #   that is updated incrementally as cards move.
+        #   Each card is keyed by the card it rests on,
+        #   so the key does not depend on the cascade order.
+        #   With symmetric, the key packs the keys of every relabelling
+        #   of the suits and the memento is the smallest of them.
+        assert not ( exact and symmetric ), "Suit symmetry needs position keys"
+        self._exact = exact
+        self._symmetric = keyBits if symmetric else 0
+        self._zobrist = symmetricTable( keyBits ) if symmetric else zobristTable( keyBits )
+        self._key = self.computeKey()
+
+        #   What happened in the last search,
+        #   and how often the exact memento was rebuilt
+        self._search = {}
+        self._resorts = 0
+        self._rehashes = 0
+
+        #   The safe moves to make automatically,
+        #   and whether to move stacks in one turn
+        self.setRules( rules )
+        self._supermoves = supermoves
+
+        #   Move generation uses an index that moveCard keeps up to date
+        self.reindex()
+
+    def reindex(self):
+        """Rebuild the move generation index from scratch:
+        the cascade holding each top card, the number of open cells
+        and the number of empty cascades.
+        Call this after changing the cascades or cells directly."""
+        self._tops = { cascade[-1]: c for c, cascade in enumerate(self._tableau) if cascade }
+        self._openCells = self._cells.count( noCard )
+        self._empties = sum( 1 for cascade in self._tableau if not cascade )
+
     def __str__(self):
         result = []
 
@@ -107,10 +305,11 @@ class Board:
 
         #   Columns in the middle
         result.append('Table:')
-        rows = max([len(cascade) for cascade in self._tableau])
+        tableau = self.cascades()
+        rows = max([len(cascade) for cascade in tableau])
         for r in range(rows):
             row = []
-            for cascade in self._tableau:
+            for cascade in tableau:
                 row.append(formatCard(cascade[r] if r < len(cascade) else noCard))
             result.append(' '.join(row))
         result.append('')
@@ -123,6 +322,10 @@ class Board:
 
         return '\n'.join(result)
 
+    def cascades(self):
+        """The cascades as lists of cards, bottom to top."""
+        return self._tableau
+
     def isFoundationIndex(self, idx):
         return idx < 0
 
@@ -146,7 +349,7 @@ class Board:
             return self._cells[self.cellOfIndex( idx )]
 
         elif self.isFoundationIndex( idx ):
-            cardSuit = foundationOfIndex( idx )
+            cardSuit = self.foundationOfIndex( idx )
             return makeCard( cardSuit, self._foundations[ cardSuit ] )
 
         else:
@@ -163,7 +366,7 @@ class Board:
             assert card not in cards, f"Duplicate card {formatCard(card)} in cell {cell}"
             if card != noCard: cards.add(card)
 
-        for column, cascade in enumerate(self._tableau):
+        for column, cascade in enumerate(self.cascades()):
             for row, card in enumerate(cascade):
                 assert card not in cards, f"Duplicate card {formatCard(card)} in cascade {column}, row {row}"
 
@@ -173,6 +376,16 @@ class Board:
             for card in range(0, self._nsuits * 13):
                 assert card in cards, f"Missing card {formatCard(card)}"
 
+    def computeKey(self):
+        """Compute the Zobrist key of the cascades from scratch."""
+        key = 0
+        for cascade in self.cascades():
+            under = noCard
+            for card in cascade:
+                key ^= self._zobrist[zobristIndex( card, under )]
+                under = card
+        return key
+
     def moveCard(self, move, validate = False):
         """Move a card at the start location to the finish
         location. Negative locations are the aces;
@@ -203,6 +416,7 @@ class Board:
                 assert self._cells[cell] != noCard, f"Move from empty cell {cell}"
             card = self._cells[cell]
             self._cells[cell] = noCard
+            self._openCells += 1
 
             #   Check whether this is now the first free cell
             if self._firstFree > cell:
@@ -214,7 +428,14 @@ class Board:
             if validate:
                 assert cascade, f"Move from empty cascade {start}"
             card = cascade.pop()
-            if not cascade: self._resort = True
+            del self._tops[card]
+            if cascade:
+                self._key ^= self._zobrist[card * 53 + cascade[-1] + 1]
+                self._tops[cascade[-1]] = start
+            else:
+                self._key ^= self._zobrist[card * 53]
+                self._resort = True
+                self._empties += 1
 
 
         #   To a foundation
@@ -235,6 +456,7 @@ class Board:
                 assert cell < len(self._cells), f"Move to invalid cell {cell}"
                 assert self._cells[cell] == noCard, f"Move to occupied cell {formatCard(self._cells[cell])}"
             self._cells[cell] = card
+            self._openCells -= 1
 
             #   Update the first free cell
             if cell == self._firstFree:
@@ -249,25 +471,110 @@ class Board:
             cascade = self._tableau[finish]
             if validate and cascade:
                 assert cascade[-1] == card + 1, f"Move of {formatCard(card)} to cascade {finish} not onto subsequent card {formatCard(cascade[-1])}"
-            if not cascade: self._resort = True
+            if cascade:
+                self._key ^= self._zobrist[card * 53 + cascade[-1] + 1]
+                del self._tops[cascade[-1]]
+            else:
+                self._key ^= self._zobrist[card * 53]
+                self._resort = True
+                self._empties -= 1
             cascade.append(card)
+            self._tops[card] = finish
 
         #   Need to rehash after moving
         self._rehash = True
 
         if validate:
             self.checkCards()
+            assert self._key == self.computeKey(), f"Position key out of date after move {move}"
+            index = ( self._tops, self._openCells, self._empties, )
+            self.reindex()
+            assert index == ( self._tops, self._openCells, self._empties, ), f"Move index out of date after move {move}"
 
         return move
 
+    def moveStack(self, move, validate = False):
+        """Make a supermove (start, finish, count) that moves the top count
+        cards of a cascade together, through the open cells and the empty
+        cascades. Return the single card moves it took."""
+        start, finish, count = move
+        cells = [self.indexOfCell( cell ) for cell, card in enumerate(self._cells) if card == noCard]
+        empties = [c for c, cascade in enumerate(self.cascades()) if not cascade and c != finish]
+        moves = []
+
+        def shift( count, start, finish, empties ):
+            if count <= len(cells) + 1:
+                #   Spread the cards over the cells and gather them again
+                used = cells[:count - 1]
+                for cell in used: moves.append( self.moveCard( (start, cell,), validate ) )
+                moves.append( self.moveCard( (start, finish,), validate ) )
+                for cell in reversed( used ): moves.append( self.moveCard( (cell, finish,), validate ) )
+
+            else:
+                #   Park the top of the stack in an empty cascade
+                spare, rest = empties[0], empties[1:]
+                part = min( ( len(cells) + 1 ) << len(rest), count - 1 )
+                shift( part, start, spare, rest )
+                shift( count - part, start, finish, rest )
+                shift( part, spare, finish, rest )
+
+        assert count <= ( len(cells) + 1 ) << len(empties), f"Supermove {move} is too large"
+        shift( count, start, finish, empties )
+        return moves
+
+    def makeMove(self, move, validate = False):
+        """Make a move from enumerateMoves, which may be a supermove,
+        and return the single card moves it took."""
+        if len(move) == 2: return [self.moveCard( move, validate )]
+        return self.moveStack( move, validate )
+
     def backtrack(self, moves, validate = False):
         """Undoes a sequence of moves by executing them in reverse order."""
         while moves:
             finish, start = moves.pop()
             self.moveCard((start, finish,), validate)
 
-    def moveToFoundations( self, validate = False ):
-        """Move all cards that can cover aces.
+    def setRules(self, rules):
+        for rule in rules:
+            assert rule in self.safeRules, f"Unknown safe rule {rule}"
+        self._rules = tuple( rules )
+
+    def safeMoves(self, move = None, validate = False):
+        """Make the first move allowed by the safe rules, followed
+        by the automatic moves after it, and return the moves.
+
+            cells - move a card from a cell onto the next card of its suit
+            kings - move a king from a cell into an empty cascade
+
+        Either move can be undone by moving the card back to its cell,
+        so they never make a board unsolvable. To allow that, the card
+        the turn's own move put in a cell is left there.
+        Solution lengths still count turns, so the shortest solution
+        with the rules can be longer than the shortest one without them."""
+        held = move[1] if move is not None and self.isCellIndex( move[1] ) else None
+        cascades = self.cascades()
+        for cell, card in enumerate(self._cells):
+            start = self.indexOfCell( cell )
+            if card == noCard or start == held: continue
+
+            finish = None
+            if pips(card) == king:
+                if 'kings' in self._rules:
+                    finish = next( ( c for c, cascade in enumerate(cascades) if not cascade ), None )
+            elif 'cells' in self._rules:
+                finish = next( ( c for c, cascade in enumerate(cascades) if cascade and cascade[-1] == card + 1 ), None )
+
+            if finish is not None:
+                moves = [self.moveCard( (start, finish,), validate )]
+                moves.extend( self.moveToFoundations( validate, move ) )
+                return moves
+
+        return []
+
+    def moveToFoundations( self, validate = False, move = None ):
+        """Move all cards that can cover aces,
+        and then make any moves allowed by the safe rules (see safeMoves),
+        given the move that started the turn.
         Return a list of the moves.
         This list should be treated as a single unit."""
         moves = []
@@ -299,47 +606,77 @@ class Board:
                     finish = self.indexOfFoundation(cardSuit)
                     moves.append( self.moveCard( (start, finish, ), validate ) )
 
+        if self._rules: moves.extend( self.safeMoves( move, validate ) )
+
         return moves
 
+    def emptyCascades(self):
+        """The empty cascades, in order."""
+        if not self._empties: return []
+        return [c for c, cascade in enumerate(self._tableau) if not cascade]
+
     def enumerateFinishCascades(self, start, card):
         """Enumerate all the finish cascades for a card."""
+        under = self._tops.get( card + 1 )
+
+        #   Don't move between empty cascades - NOP
+        finishes = []
+        if self.isCellIndex( start ) or len(self._tableau[start]) > 1:
+            finishes = self.emptyCascades()
+
+        if under is not None:
+            finishes = sorted( finishes + [under] )
+
+        return [(start, finish,) for finish in finishes]
+
+    def movableStack(self, cascade):
+        """Whether a stacked cascade should be moved at all.
+        If the stack is anchored on a king, don't move anything."""
+        return self._openCells >= len( cascade ) or not isKingStack( cascade )
+
+    def enumerateSupermoves(self):
+        """Enumerate the supermoves (start, finish, count) that move
+        two or more cards of a stacked run together: onto the next card
+        of their suit, or the whole run to the first empty cascade.
+        A run of count cards can be moved through the open cells
+        and empty cascades if count <= (cells + 1) * 2 ** empties."""
+        cascades = self.cascades()
+        cells = self._cells.count( noCard )
+        empties = [c for c, cascade in enumerate(cascades) if not cascade]
         moves = []
+        for start, cascade in enumerate(cascades):
+            run = 1
+            while run < len(cascade) and cascade[-run - 1] == cascade[-run] + 1 and pips( cascade[-run] ) != king:
+                run += 1
+            if run < 2: continue
 
-        fromCell = self.isCellIndex( start )
-        for finish, cascade in enumerate(self._tableau):
-            if start == finish: continue
-
-            if cascade:
-                under = cascade[-1]
-                #   We can't stack a king on an ace because
-                #   exposed aces are always removed first
-                if under == card + 1:
-                    moves.append((start, finish,))
+            for finish, under in enumerate(cascades):
+                if under:
+                    count = under[-1] - cascade[-1]
+                    if 2 <= count <= run and count <= ( cells + 1 ) << len(empties):
+                        moves.append( (start, finish, count,) )
 
-            #   Don't move between empty cascades - NOP
-            elif fromCell or len(self._tableau[start]) > 1:
-                moves.append((start, finish,))
+                elif finish == empties[0] and run < len(cascade) and run <= ( cells + 1 ) << ( len(empties) - 1 ):
+                    moves.append( (start, finish, run,) )
 
         return moves
 
     def enumerateMoves(self):
-        """Enumerate all the legal moves that can be made."""
+        """Enumerate all the legal moves that can be made.
+        With supermoves, moves of whole stacks (see enumerateSupermoves)
+        are tried first."""
 
         #   3. Move from cascades to the first open cell
         stacked_to_cell = []        #   Stacked card to free cell
         isolate_to_cell = []        #   Isolate card to free cell
-        openCells = 0
-        if self._firstFree < len(self._cells):
-            for card in self._cells: openCells += ( card == noCard )
-
+        if self._openCells:
             finish = self.indexOfCell(self._firstFree)
             for start, cascade in enumerate(self._tableau):
                 if not cascade:
                     continue
 
                 elif isStacked( cascade ):
-                    #   If the stack is anchored on a king, don't move anything
-                    if openCells >= len( cascade ) or not isKingStack( cascade ):
+                    if self.movableStack( cascade ):
                         stacked_to_cell.append( (start, finish,) )
 
                 else:
@@ -347,18 +684,27 @@ class Board:
 
         #   2. Move from cells to cascades
         cell_to_cascade = []        #   Cell card to any cascade
-        for start, card in enumerate(self._cells):
-            if card != noCard:
-                cell_to_cascade.extend(self.enumerateFinishCascades(self.indexOfCell(start), card))
+        if self._openCells < len(self._cells):
+            for start, card in enumerate(self._cells):
+                if card != noCard:
+                    cell_to_cascade.extend(self.enumerateFinishCascades(self.indexOfCell(start), card))
 
         #   1. Move from cascades to cascades
         stacked_to_open = []        #   Stacked card to open cascade
         isolate_to_cascade = []     #   Isolate card to any cascade
+        tops = self._tops
+        empties = self._empties
         for start, cascade in enumerate(self._tableau):
             if cascade:
-                finishes = self.enumerateFinishCascades(start, cascade[-1])
+                #   Most cards have at most one place to go
+                if empties:
+                    finishes = self.enumerateFinishCascades(start, cascade[-1])
+                else:
+                    under = tops.get( cascade[-1] + 1 )
+                    finishes = [] if under is None else [(start, under,)]
+
                 if isStacked( cascade ):
-                    if openCells >= len( cascade ) or not isKingStack( cascade ):
+                    if self.movableStack( cascade ):
                         stacked_to_open.extend( finishes )
                 else:
                     isolate_to_cascade.extend( finishes )
@@ -372,111 +718,675 @@ class Board:
         moves.extend( cell_to_cascade )
         moves.extend( stacked_to_open )
         moves.extend( isolate_to_cascade )
+        if self._supermoves: moves.extend( self.enumerateSupermoves() )
 
         return moves
 
+    def iterateMoves(self):
+        """Generate the moves of enumerateMoves lazily, in the order they
+        would be popped from its list, so the most promising moves come first.
+        Each move is worked out when it is needed, so the board can be
+        changed between moves, as long as it is restored before the next one."""
+        tableau = self._tableau
+        ncascades = len(tableau)
+
+        #   0. Move stacks
+        if self._supermoves:
+            for move in reversed( self.enumerateSupermoves() ):
+                yield move
+
+        #   1. Move from cascades to cascades, isolated cards first
+        for stacked in ( False, True, ):
+            for start in range(ncascades - 1, -1, -1):
+                cascade = tableau[start]
+                if not cascade or isStacked( cascade ) != stacked: continue
+                if stacked and not self.movableStack( cascade ): continue
+
+                for move in reversed( self.enumerateFinishCascades(start, cascade[-1]) ):
+                    yield move
+
+        #   2. Move from cells to cascades
+        for cell in range(len(self._cells) - 1, -1, -1):
+            card = self._cells[cell]
+            if card != noCard:
+                for move in reversed( self.enumerateFinishCascades(self.indexOfCell(cell), card) ):
+                    yield move
+
+        #   3. Move from cascades to the first open cell
+        for stacked in ( False, True, ):
+            for start in range(ncascades - 1, -1, -1):
+                if not self._openCells: return
+
+                cascade = tableau[start]
+                if not cascade or isStacked( cascade ) != stacked: continue
+                if stacked and not self.movableStack( cascade ): continue
+
+                yield (start, self.indexOfCell(self._firstFree),)
+
     def memento(self):
-        """Lazily compute the cached memento."""
+        """The position key of the board, which ignores the order of the cascades.
+        Keys are random 64 or 128 bit numbers (keyBits), so different positions
+        can collide, which is very unlikely with 128 bits but possible.
+        With symmetric, positions that only differ by relabelling the suits
+        have the same key (see symmetricKey).
+        In exact mode, this is the lazily computed tuple of sorted cascades,
+        which is the only mode that can never collide."""
+        if not self._exact: return self.symmetricKey() if self._symmetric else self._key
 
         #   If the cascades are out of order, then re-sort them
         if self._resort:
             self._sorted.sort()
             self._resort = False
             self._rehash = True
+            self._resorts += 1
 
-        #   If cards moved, re-hash the sorted cascades
+        #   If cards moved, rebuild the sorted cascades
         if self._rehash:
-            self._memento = hash( tuple(tuple(cascade) for cascade in self._sorted) )
+            self._memento = tuple(tuple(cascade) for cascade in self._sorted)
             self._rehash = False
+            self._rehashes += 1
 
         return self._memento
 
+    def symmetricKey(self):
+        """The smallest key of all the relabellings of the suits.
+        The rules don't depend on the suits, so relabelled positions
+        are solved by the same moves."""
+        bits = self._symmetric
+        mask = ( 1 << bits ) - 1
+        key = self._key
+        return min( ( key >> shift ) & mask for shift in range( 0, bits * len(suitPermutations), bits ) )
+
     def solved(self):
         return sum(self._foundations) == self._nsuits * 12
 
-    def solve(self, callback = None, validate = False ):
+    def remaining(self):
+        """The number of cards not on the foundations."""
+        return self._nsuits * 12 - sum(self._foundations)
+
+    def usedCells(self):
+        """The number of cells holding cards."""
+        return len(self._cells) - self._cells.count( noCard )
+
+    def lowerBound(self):
+        """A lower bound on the number of turns needed to solve the board.
+        A card resting above a lower card of its own suit can't go to a foundation
+        before that card does, so every such card needs a move of its own."""
+        if self.solved(): return 0
+
+        buried = 0
+        for cascade in self.cascades():
+            lowest = self._nsuits * [ king + 1 ]
+            for card in cascade:
+                cardSuit = suit(card)
+                cardPips = pips(card)
+                if cardPips > lowest[cardSuit]:
+                    buried += 1
+                else:
+                    lowest[cardSuit] = cardPips
+
+        return max( buried, 1 )
+
+    def solve(self, callback = None, validate = False, visited = None, strategy = 'dfs', weight = 2,
+              maxNodes = None, maxSeconds = None, cancel = None, callbackEvery = 1, timers = 0, lazy = False, positions = None, reopen = False,
+              orderer = None ):
+        """Finds a solution of the board using the given strategy:
+
+            dfs   - depth first search in move order (solveDepthFirst)
+            astar - weighted best first search (solveBestFirst)
+            ida   - iterative deepening for a shortest solution (solveIterativeDeepening)
+
+        The search stops after maxNodes positions, after maxSeconds seconds
+        or when the cancel token (anything with an is_set method, such as
+        a threading.Event) is set, returning the best solution found so far.
+        The callback is called every callbackEvery positions,
+        or with 0 only when a new solution is found.
+        With timers, every timers'th call to enumerateMoves and moveToFoundations
+        is timed to estimate the time spent in them.
+        The depth first search can generate its moves lazily, share
+        what it learns about positions with other searches, search
+        positions again when they are reached by shorter paths
+        and order its moves with an orderer (see solveDepthFirst).
+        searchStats() reports what the search did and why it stopped.
+
+        The other arguments are passed on to the strategy."""
+        limits = SearchLimits( maxNodes, maxSeconds, cancel )
+        if strategy == 'astar':
+            return self.solveBestFirst( callback, validate, visited, weight, limits, callbackEvery, timers )
+
+        elif strategy == 'ida':
+            return self.solveIterativeDeepening( callback, validate, visited, limits, callbackEvery, timers )
+
+        assert strategy == 'dfs', f"Unknown search strategy {strategy}"
+        return self.solveDepthFirst( callback, validate, visited, limits = limits, callbackEvery = callbackEvery, timers = timers, lazy = lazy, positions = positions, reopen = reopen,
+                                    orderer = orderer )
+
+    def searchStats(self):
+        """Statistics of the last search as a dictionary:
+
+            nodes      - the number of moves searched
+                         (positions expanded for best first search)
+            expansions - the number of positions whose moves were enumerated
+            branching  - the average number of moves per expansion
+            maxDepth   - the deepest stack of levels (or turns for best first search)
+            resorts    - how often the exact memento re-sorted the cascades
+            rehashes   - how often the exact memento was rebuilt
+            seconds    - the time taken
+            stopped    - why the search stopped early ('nodes', 'seconds',
+                         'cancelled' or 'callback'), or None
+
+        The depth first search also reports the number of positions
+        it proved dead and the number it reopened (see solveDepthFirst).
+        With timers, the estimated seconds spent in enumerateMoves
+        and moveToFoundations are added."""
+        return self._search
+
+    def _beginSearch(self, timers = 0):
+        """Start the statistics of a search and return the move generators to use,
+        which are timed when asked for."""
+        stats = { 'start': time.perf_counter(), 'resorts': self._resorts, 'rehashes': self._rehashes, 'timings': {}, }
+
+        enumerateMoves = self.enumerateMoves
+        moveToFoundations = self.moveToFoundations
+        if timers:
+            enumerateMoves = sampledTimer( enumerateMoves, timers, stats['timings'], 'enumerateMoves' )
+            moveToFoundations = sampledTimer( moveToFoundations, timers, stats['timings'], 'moveToFoundations' )
+
+        self._search = stats
+        return enumerateMoves, moveToFoundations
+
+    def _endSearch(self, nodes, stopped, expansions, generated, maxDepth):
+        """Record the statistics of a search."""
+        stats = self._search
+        self._search = {
+            'nodes': nodes,
+            'expansions': expansions,
+            'branching': generated / expansions if expansions else 0.0,
+            'maxDepth': maxDepth,
+            'resorts': self._resorts - stats['resorts'],
+            'rehashes': self._rehashes - stats['rehashes'],
+            'seconds': time.perf_counter() - stats['start'],
+            'stopped': stopped,
+        }
+        for name, seconds in stats['timings'].items():
+            self._search[name + 'Seconds'] = seconds
+
+    def solveDepthFirst(self, callback = None, validate = False, visited = None, prefix = None, incumbent = None,
+                        limits = None, callbackEvery = 1, timers = 0, lazy = False, positions = None, reopen = False,
+                        orderer = None ):
         """Finds the first solution of the board using a depth first search.
-        If a callback is provided, it will be given the board, solution and visited hash set
-        and should return True to keep searching for shorter solutions, False to terminate."""
+        If a callback is provided, it will be given the board, solution and visited table
+        and should return True to keep searching for shorter solutions, False to terminate.
+        The visited table maps the mementos of the positions already seen
+        to the shortest depth they were reached at. It defaults to a dictionary,
+        but a lossy fixed size table (such as table.TranspositionTable) can be
+        used instead. Every position the table forgets may have to be searched
+        again, so a table that is much smaller than the search can make it
+        take exponentially longer.
+
+        With reopen, once a solution is known, a position reached by a shorter path
+        than before is searched again, since it may now lead to a shorter solution.
+        This finds shorter solutions for the same number of nodes on many deals,
+        but takes much longer to exhaust the search.
+        Positions whose moves have all been searched without finding a solution,
+        and without being cut short by the length of the solution or by the
+        positions being explored above them, are dead and are never searched again.
+
+        To search a subtree, pass the turns that led to the current position
+        as the prefix; solutions then start with the prefix.
+        The incumbent is a shared multiprocessing.Value holding the length
+        of the shortest solution found by any search (0 for none).
+        It is used to cut long lines and updated with any shorter solutions.
+
+        With lazy, each level of the search holds an iterateMoves generator,
+        so moves are only worked out when they are tried and abandoned levels
+        cost a generator frame instead of a list of moves. The branching statistic
+        then counts the moves tried. Otherwise each level holds a list of its moves.
+        Building the lists is faster than running the generators, so lazy is off by default.
+
+        The positions database (positions.PositionDatabase) is shared between
+        searches. Positions it knows to be dead are skipped, and positions
+        it knows how to finish are finished from it when that is shorter.
+        Every solution found is recorded in it, and when the search proves
+        the board unsolvable, every position it visited is marked dead.
+        It needs position keys rather than exact mementos.
+
+        The orderer (see ordering.Orderer) sorts the moves of each level
+        and learns from every solution found. Ordered levels hold lists,
+        so the search is not lazy.
+        The limits, callbackEvery and timers arguments are described in solve()."""
         solution = []
+        if limits is None: limits = SearchLimits()
+        checkAt = limits.checkAt
+        nodes = 0
+        stopped = None
+
+        #   Statistics
+        enumerateMoves, moveToFoundations = self._beginSearch( timers )
+        iterateMoves = self.iterateMoves
+        if orderer is not None:
+            generate = enumerateMoves
+            enumerateMoves = lambda: orderer.order( self, generate() )
+            lazy = False
+        expansions = 0
+        generated = 0
+        maxDepth = 0
 
         #   Search state
-        visited = set()
+        assert positions is None or not self._exact, "Position databases need position keys"
+        ownVisited = visited is None
+        if visited is None: visited = {}
         stack = []
         history = []
 
-        #   Move the aces
-        moves = self.moveToFoundations()
-        history.append(moves)
+        #   The position of each level, and whether everything
+        #   below it so far has been proven dead
+        path = []
+        clean = []
+        dead = set()
+        reopened = 0
+
+        #   Lossy tables can forget the positions we are exploring,
+        #   so we have to remember them ourselves to avoid looping.
+        lossy = getattr( visited, 'lossy', False )
+        onPath = set()
+
+        if prefix is None:
+            #   Move the aces
+            moves = moveToFoundations()
+            history.append(moves)
+        else:
+            #   Continue from the end of the prefix
+            history.extend(prefix)
         if self.solved(): solution = history
 
         #   Remember the starting position
-        visited.add(self.memento())
+        memento = self.memento()
+        visited[memento] = len(history)
+
+        #   Add the first level, if any.
+        #   The stack holds iterators over the untried moves of each level.
+        level = enumerateMoves()
+        expansions += 1
+        generated += len(level)
+        if level:
+            stack.append(reversed(level))
+            maxDepth = 1
+            path.append(memento)
+            clean.append(True)
+            if lossy: onPath.add(memento)
 
-        #   Add the first level, if any
-        level = self.enumerateMoves()
-        if level: stack.append(level)
         while stack:
-            #   We always remove from the backs of lists
-            #   to avoid copying
-            if stack[-1]:
-                moves = stack[-1]
-                move = moves.pop()
+            move = next(stack[-1], None)
+            if move is not None:
+                #   Check the limits every so often
+                if nodes >= checkAt:
+                    stopped = limits.exceeded( nodes )
+                    if stopped: break
+                    checkAt = limits.checkAt
+                nodes += 1
+
                 try:
-                    self.moveCard( move, validate )
+                    moves = [self.moveCard( move, validate ),] if len(move) == 2 else self.moveStack( move, validate )
                 except:
                     print( move )
                     print( self )
                     raise
 
-                moves = [move,]
-                moves.extend(self.moveToFoundations())
+                moves.extend(moveToFoundations( False, move ))
                 history.append(moves)
 
                 tooLong = ( solution and len(solution) <= len(history) )
+                if incumbent is not None and not tooLong:
+                    shortest = incumbent.value
+                    tooLong = ( shortest and shortest <= len(history) )
+
+                #   Can we finish from a known solution?
+                finish = None
+                if positions is not None and not tooLong and not self.solved():
+                    best = len(solution) if solution else ( incumbent.value if incumbent is not None else 0 )
+                    finish = positions.finish( self, best - len(history) if best else None )
 
                 #   Are we done?
-                terminated = callback and not callback(board=self, history=history, solution=solution, visited=visited)
-                if terminated or self.solved():
+                terminated = False
+                if callback and callbackEvery and not nodes % callbackEvery:
+                    terminated = not callback(board=self, history=history, solution=solution, visited=visited)
+                if terminated or self.solved() or finish:
+                    clean[-1] = False
+
                     #   Keep the shortest solution
-                    if self.solved() and not tooLong:
-                        solution = copy.deepcopy( history )
+                    if ( self.solved() or finish ) and not tooLong:
+                        solution = [turn.copy() for turn in history]
+                        if finish: solution.extend( finish )
+                        if positions is not None: positions.record( self, solution, len(history) )
+                        if orderer is not None: orderer.learn( self, solution, len(history) )
                         if not callback: terminated = True
+                        elif not callbackEvery:
+                            terminated = not callback(board=self, history=history, solution=solution, visited=visited)
 
-                    if terminated: break
+                        #   Share the new length with the other searches
+                        if incumbent is not None:
+                            with incumbent.get_lock():
+                                if not incumbent.value or len(solution) < incumbent.value:
+                                    incumbent.value = len(solution)
+
+                    if terminated:
+                        if callback: stopped = 'callback'
+                        break
 
                     #   Nowhere else to go
                     self.backtrack(history.pop())
                     continue
 
-                #   Check whether we have been here before
+                #   Check whether we have been here before,
+                #   or by a shorter path when we are looking for shorter solutions
                 memento = self.memento()
-                if memento in visited or tooLong:
+                seen = visited.get( memento )
+                if memento in dead or ( positions is not None and positions.isDead( memento ) ):
+                    self.backtrack( history.pop(), validate )
+
+                elif tooLong or ( lossy and memento in onPath ) or \
+                        ( seen is not None and not ( reopen and len(history) < seen and ( solution or ( incumbent is not None and incumbent.value ) ) ) ):
                     #   Abort this level if we have been here before
+                    clean[-1] = False
                     self.backtrack( history.pop(), validate )
 
                 else:
                     #   Remember this position
-                    visited.add(memento)
-                    #   Go down one level, if we can
-                    level = self.enumerateMoves()
-                    if level:
+                    if seen is not None: reopened += 1
+                    visited[memento] = len(history)
+                    #   Go down one level, if we can.
+                    #   Lazy levels are only known to be empty
+                    #   when we try to take a move from them.
+                    expansions += 1
+                    if lazy:
+                        level = iterateMoves()
+                    else:
+                        level = enumerateMoves()
+                        generated += len(level)
+                        level = reversed(level) if level else None
+
+                    if level is not None:
                         stack.append(level)
+                        if len(stack) > maxDepth: maxDepth = len(stack)
+                        path.append(memento)
+                        clean.append(True)
+                        if lossy: onPath.add(memento)
                     else:
+                        #   No moves and not solved
+                        dead.add(memento)
+                        if positions is not None: positions.markDead( memento )
                         self.backtrack( history.pop(), validate )
 
             else:
                 #   Go up one level
                 stack.pop()
+                memento = path.pop()
+                if lossy: onPath.discard(memento)
+
+                #   Nothing below here can be solved
+                if clean.pop():
+                    dead.add(memento)
+                    if positions is not None: positions.markDead( memento )
+                elif clean:
+                    clean[-1] = False
+
                 #   Back out the move
                 self.backtrack(history.pop())
 
+        if lazy: generated = nodes
+        self._endSearch( nodes, stopped, expansions, generated, maxDepth )
+        self._search['dead'] = len(dead)
+        self._search['reopened'] = reopened
+
+        #   Nothing we visited can be solved if we looked everywhere
+        if positions is not None and ownVisited and not solution and not stopped and incumbent is None:
+            for memento in visited:
+                positions.markDead( memento )
+
         #   Final callback with empty history
         if callback: callback(board=self, history=history, solution=solution, visited=visited)
 
         #   Empty stack => empty history
         return solution
 
+    def travel(self, current, target, validate = False):
+        """Move the board from one search node to another.
+        Nodes are [parent, turn, depth] lists, so we back out
+        to the common ancestor and then replay down to the target."""
+        forward = []
+        while current[2] > target[2]:
+            self.backtrack( current[1].copy(), validate )
+            current = current[0]
+        while target[2] > current[2]:
+            forward.append( target[1] )
+            target = target[0]
+        while current is not target:
+            self.backtrack( current[1].copy(), validate )
+            current = current[0]
+            forward.append( target[1] )
+            target = target[0]
+
+        while forward:
+            for move in forward.pop():
+                self.moveCard( move, validate )
+
+    def solveBestFirst(self, callback = None, validate = False, visited = None, weight = 2, limits = None, callbackEvery = 1, timers = 0 ):
+        """Finds a short solution of the board using a weighted A* search.
+        Positions are expanded in order of their depth plus weight times lowerBound(),
+        preferring positions with fewer cards left to play. A weight of 1 gives A*,
+        which finds shortest solutions but expands many more positions.
+        With supermoves, one turn can free several buried cards, so lowerBound()
+        can overestimate and even A* solutions may not be the shortest.
+
+        Without a callback, the first solution found is returned.
+        Otherwise the callback is called for each expanded position, as in
+        solveDepthFirst, and the search continues until the callback returns False,
+        no shorter solution is possible or every position has been expanded.
+        The visited table maps mementos to the shortest depth they were reached at.
+        The limits, callbackEvery and timers arguments are described in solve()."""
+        solution = []
+        if visited is None: visited = {}
+        if limits is None: limits = SearchLimits()
+        checkAt = limits.checkAt
+        nodes = 0
+        stopped = None
+
+        #   Statistics
+        enumerateMoves, moveToFoundations = self._beginSearch( timers )
+        generated = 0
+        maxDepth = 0
+
+        #   Nodes are [parent, turn, depth] so solutions
+        #   can be reconstructed by following the parents
+        root = [None, moveToFoundations( validate ), 1]
+        if self.solved():
+            self._endSearch( nodes, stopped, nodes, generated, maxDepth )
+            return [root[1]]
+        visited[self.memento()] = root[2]
+
+        def path( node ):
+            history = []
+            while node:
+                history.append( node[1] )
+                node = node[0]
+            history.reverse()
+            return history
+
+        #   The open list is ordered by weighted cost,
+        #   then by cards left, then by insertion order
+        sequence = 0
+        frontier = [( weight * self.lowerBound(), self.remaining(), sequence, root, )]
+        current = root
+
+        while frontier:
+            cost, remaining, order, node = heapq.heappop( frontier )
+
+            #   Skip positions that have since been reached more quickly
+            if solution and node[2] + 1 >= len(solution): continue
+            self.travel( current, node, validate )
+            current = node
+            if visited.get( self.memento(), node[2] ) < node[2]: continue
+
+            #   Check the limits every so often
+            if nodes >= checkAt:
+                stopped = limits.exceeded( nodes )
+                if stopped: break
+                checkAt = limits.checkAt
+            nodes += 1
+
+            #   Are we done?
+            if callback and callbackEvery and not nodes % callbackEvery:
+                if not callback(board=self, history=path(node), solution=solution, visited=visited):
+                    stopped = 'callback'
+                    break
+
+            moves = enumerateMoves()
+            generated += len(moves)
+            if node[2] > maxDepth: maxDepth = node[2]
+            for move in moves:
+                turn = self.makeMove( move, validate )
+                turn.extend( moveToFoundations( validate, move ) )
+                depth = node[2] + 1
+
+                if self.solved():
+                    if not solution or depth < len(solution):
+                        solution = path( node )
+                        solution.append( turn )
+                        if callback and not callbackEvery and not callback(board=self, history=solution, solution=solution, visited=visited):
+                            stopped = 'callback'
+
+                else:
+                    memento = self.memento()
+                    bound = self.lowerBound()
+                    seen = visited.get( memento )
+                    if ( seen is None or depth < seen ) and ( not solution or depth + bound < len(solution) ):
+                        visited[memento] = depth
+                        sequence += 1
+                        child = [node, turn, depth]
+                        heapq.heappush( frontier, ( depth + weight * bound, self.remaining(), sequence, child, ) )
+
+                self.backtrack( turn.copy(), validate )
+
+            if stopped or ( solution and not callback ): break
+
+        #   Return to the starting position
+        self.travel( current, root, validate )
+        self._endSearch( nodes, stopped, nodes, generated, maxDepth )
+
+        #   Final callback with the starting position
+        if callback: callback(board=self, history=[root[1]], solution=solution, visited=visited)
+
+        return solution
+
+    def solveIterativeDeepening(self, callback = None, validate = False, visited = None, limits = None, callbackEvery = 1, timers = 0 ):
+        """Finds a shortest solution of the board using an IDA* search.
+        Each iteration is a depth first search that abandons positions whose depth
+        plus lowerBound() exceeds a threshold, which starts at the lower bound of
+        the board and grows to the smallest value that was abandoned. The first
+        solution found is therefore as short as any the moves of enumerateMoves allow,
+        except with supermoves, where one turn can free several buried cards,
+        so lowerBound() can overestimate and the solution may not be the shortest.
+
+        The visited table maps mementos to the shortest depth they were reached at
+        in the current iteration, and positions reached again no more quickly are skipped.
+        It is cleared between iterations, so a fixed size table keeps the memory bounded,
+        but the counters of a table.TranspositionTable cover every iteration.
+        If a callback is provided, it is called for each position and can
+        return False to stop the search, in which case no solution is returned.
+        The same goes for the limits, which are described in solve()
+        along with callbackEvery and timers. The statistics cover every iteration."""
+        if visited is None: visited = {}
+        if limits is None: limits = SearchLimits()
+        checkAt = limits.checkAt
+        nodes = 0
+        stopped = None
+
+        #   Statistics
+        enumerateMoves, moveToFoundations = self._beginSearch( timers )
+        expansions = 0
+        generated = 0
+        maxDepth = 0
+
+        history = [moveToFoundations( validate )]
+        if self.solved():
+            self._endSearch( nodes, stopped, expansions, generated, maxDepth )
+            return history
+
+        threshold = len(history) + self.lowerBound()
+        while True:
+            visited.clear()
+            visited[self.memento()] = len(history)
+            exceeded = None
+            solution = []
+
+            stack = [enumerateMoves()]
+            expansions += 1
+            generated += len(stack[-1])
+            maxDepth = max( maxDepth, len(stack) )
+            while stack:
+                if not stack[-1]:
+                    #   Go up one level
+                    stack.pop()
+                    if stack: self.backtrack( history.pop(), validate )
+                    continue
+
+                #   Check the limits every so often
+                if nodes >= checkAt:
+                    stopped = limits.exceeded( nodes )
+                    if stopped: break
+                    checkAt = limits.checkAt
+                nodes += 1
+
+                move = stack[-1].pop()
+                moves = self.makeMove( move, validate )
+                moves.extend( moveToFoundations( validate, move ) )
+                history.append( moves )
+
+                if callback and callbackEvery and not nodes % callbackEvery:
+                    if not callback(board=self, history=history, solution=solution, visited=visited):
+                        stopped = 'callback'
+                        break
+
+                if self.solved():
+                    solution = [turn.copy() for turn in history]
+                    if callback and not callbackEvery:
+                        callback(board=self, history=history, solution=solution, visited=visited)
+                    break
+
+                #   Abandon positions that can't be solved in time,
+                #   but remember the smallest overrun for the next iteration
+                depth = len(history)
+                estimate = depth + self.lowerBound()
+                memento = self.memento()
+                if estimate > threshold:
+                    if exceeded is None or estimate < exceeded: exceeded = estimate
+
+                elif visited.get( memento, depth + 1 ) > depth:
+                    visited[memento] = depth
+                    stack.append( enumerateMoves() )
+                    expansions += 1
+                    generated += len(stack[-1])
+                    if len(stack) > maxDepth: maxDepth = len(stack)
+                    continue
+
+                self.backtrack( history.pop(), validate )
+
+            #   Return to the starting position
+            while len(history) > 1:
+                self.backtrack( history.pop(), validate )
+
+            if solution or stopped or exceeded is None:
+                break
+            threshold = exceeded
+
+        self._endSearch( nodes, stopped, expansions, generated, maxDepth )
+
+        #   Final callback with the starting position
+        if callback: callback(board=self, history=history, solution=solution, visited=visited)
+
+        return solution
+
 if __name__ == '__main__':
     b = Board(range(0,52))
     print(b)
@@ -0,0 +1,151 @@
+#!/usr/bin/python3
+
+import argparse
+import hashlib
+import sqlite3
+import time
+
+import board
+
+def canonicalSuits( deck ):
+    """The suit relabelling that numbers the suits in the order they first
+    appear in the deck. The rules don't depend on the suits, so relabelled
+    deals have the same solutions, apart from the foundation numbers."""
+    suits = []
+    for card in deck:
+        cardSuit = board.suit( card )
+        if cardSuit not in suits: suits.append( cardSuit )
+    return suits
+
+def canonicalDeck( deck, suits = None ):
+    """The deck with its suits relabelled by canonicalSuits."""
+    if suits is None: suits = canonicalSuits( deck )
+    return [board.makeCard( suits.index( board.suit( card ) ), board.pips( card ) ) for card in deck]
+
+def canonicalKey( deck ):
+    """A hash of the canonical deck, so relabelled deals share a key."""
+    return hashlib.sha256( bytes( canonicalDeck( deck ) ) ).hexdigest()
+
+def relabelSolution( solution, mapping ):
+    """Relabel the foundations of a solution's moves, where
+    mapping[suit] is the new number of each suit."""
+    def relabel( location ):
+        return -mapping[-location - 1] - 1 if location < 0 else location
+
+    return [[( relabel( start ), relabel( finish ), ) for start, finish in turn] for turn in solution]
+
+class SolutionCache:
+    """An SQLite file of the best known solution for each deal.
+
+    Deals are stored by their canonical key, with the solution in the
+    canonical suits, encoded by board.encodeSolution. Each entry also
+    records whether the solution is known to be optimal, whether the deal
+    is known to be unsolvable and the total search budget spent on it."""
+
+    schema = """CREATE TABLE IF NOT EXISTS solutions (
+        key TEXT PRIMARY KEY,
+        solution BLOB,
+        length INTEGER,
+        optimal INTEGER NOT NULL DEFAULT 0,
+        unsolvable INTEGER NOT NULL DEFAULT 0,
+        nodes INTEGER NOT NULL DEFAULT 0,
+        seconds REAL NOT NULL DEFAULT 0,
+        strategy TEXT,
+        updated REAL
+    )"""
+
+    def __init__(self, path = ':memory:'):
+        self._connection = sqlite3.connect( path )
+        self._connection.execute( self.schema )
+        self._connection.commit()
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def get(self, deck):
+        """The cache entry for a deck as a dictionary, or None.
+        The solution is relabelled to the suits of the deck."""
+        row = self._connection.execute(
+            "SELECT solution, length, optimal, unsolvable, nodes, seconds, strategy FROM solutions WHERE key = ?",
+            ( canonicalKey( deck ), ) ).fetchone()
+        if row is None: return None
+
+        encoded, length, optimal, unsolvable, nodes, seconds, strategy = row
+        solution = None
+        if encoded is not None:
+            suits = canonicalSuits( deck )
+            solution = relabelSolution( board.decodeSolution( encoded ), suits )
+
+        return {
+            'solution': solution,
+            'length': length,
+            'optimal': bool( optimal ),
+            'unsolvable': bool( unsolvable ),
+            'nodes': nodes,
+            'seconds': seconds,
+            'strategy': strategy,
+        }
+
+    def put(self, deck, solution = None, optimal = False, unsolvable = False, nodes = 0, seconds = 0.0, strategy = None):
+        """Record a search of a deck. The solution only replaces
+        the stored one if it is shorter, and the budget is added
+        to the budget already spent on the deal."""
+        assert not ( solution and unsolvable ), "A solved deal can't be unsolvable"
+        key = canonicalKey( deck )
+        entry = self.get( deck )
+
+        encoded = None
+        length = None
+        if solution:
+            suits = canonicalSuits( deck )
+            mapping = [suits.index( cardSuit ) for cardSuit in range( len( suits ) )]
+            encoded = board.encodeSolution( relabelSolution( solution, mapping ) )
+            length = len( solution )
+
+        if entry is None:
+            self._connection.execute(
+                "INSERT INTO solutions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ( key, encoded, length, int( optimal ), int( unsolvable ), nodes, seconds, strategy, time.time(), ) )
+
+        else:
+            if entry['length'] is not None and ( length is None or entry['length'] <= length ):
+                #   Keep the better solution we already have
+                self._connection.execute(
+                    "UPDATE solutions SET optimal = optimal OR ?, nodes = nodes + ?, seconds = seconds + ?, updated = ? WHERE key = ?",
+                    ( int( optimal and length == entry['length'] ), nodes, seconds, time.time(), key, ) )
+            else:
+                #   A solution proves the deal solvable
+                unsolvable = not solution and ( unsolvable or entry['unsolvable'] )
+                self._connection.execute(
+                    "UPDATE solutions SET solution = ?, length = ?, optimal = ?, unsolvable = ?, nodes = nodes + ?, seconds = seconds + ?, strategy = ?, updated = ? WHERE key = ?",
+                    ( encoded, length, int( optimal ), int( unsolvable ), nodes, seconds, strategy, time.time(), key, ) )
+
+        self._connection.commit()
+
+    def __len__(self):
+        return self._connection.execute( "SELECT COUNT(*) FROM solutions" ).fetchone()[0]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Shows the cached solutions of Baker's Game deck files")
+    parser.add_argument( 'cache', type=str, help="The solution cache file")
+    parser.add_argument( 'files', metavar='file', type=str, nargs='*', help="Deck files to look up.")
+    args = parser.parse_args()
+
+    with SolutionCache( args.cache ) as solutions:
+        print( f"{len(solutions)} deals cached" )
+        for filename in args.files:
+            with open( filename, "r" ) as deckFile:
+                entry = solutions.get( board.parseDeck( deckFile.read() ) )
+            if entry is None:
+                print( f"{filename}: not cached" )
+            elif entry['unsolvable']:
+                print( f"{filename}: unsolvable after {entry['nodes']} positions" )
+            else:
+                optimal = " (optimal)" if entry['optimal'] else ""
+                print( f"{filename}: {entry['length']} moves{optimal} after {entry['nodes']} positions in {entry['seconds']:.3f}s" )
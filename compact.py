@@ -0,0 +1,431 @@
+#!/usr/bin/python3
+
+from array import array
+
+from board import Board, noCard, king, suit, isKingStack, makeCard, formatCard, zobristTable, symmetricTable
+
+class CompactBoard(Board):
+    """A Board stored in flat byte arrays.
+
+    The cascades live in a single array with a fixed stride per cascade
+    and a separate array of cascade lengths, so moving a card is a
+    couple of index calculations instead of list and method dispatch.
+    Locations, moves and backtracking behave exactly as for Board,
+    so solve() runs unchanged."""
+    __slots__ = ( '_ncascades', '_stride', '_cards', '_lengths', '_order', )
+
+    def __init__(self, deck, exact = False, keyBits = 64, symmetric = False, rules = (), supermoves = False,
+                 cells = None, cascades = None):
+        #   How many suits were we given?
+        self._nsuits = suit(len(deck))
+
+        #   Aces contains the highest pip number for that ace
+        self._foundations = array('b', self._nsuits * [ noCard ])
+
+        #   Cells contains cards, one per suit unless we are told otherwise
+        self._cells = array('b', ( self._nsuits if cells is None else cells ) * [ noCard ])
+        self._firstFree = 0
+
+        #   Columns are fixed size slices of a single array.
+        #   A cascade can grow by at most a full suit
+        #   on top of the cards it was dealt.
+        self._ncascades = self._nsuits * 2 if cascades is None else cascades
+        self._stride = ( len(deck) + self._ncascades - 1 ) // self._ncascades + 13
+        self._cards = bytearray(self._ncascades * self._stride)
+        self._lengths = bytearray(self._ncascades)
+        for d in range(0, len(deck)):
+            column = d % self._ncascades
+            self._cards[column * self._stride + self._lengths[column]] = deck[d]
+            self._lengths[column] += 1
+
+        #   The exact memento is the cascades in the order
+        #   of their first cards, which only changes when
+        #   a cascade becomes empty or stops being empty.
+        self._memento = None
+        self._resort = True
+        self._rehash = True
+        self._order = [*range(self._ncascades)]
+
+        #   Otherwise we use the same Zobrist key as Board
+        assert not ( exact and symmetric ), "Suit symmetry needs position keys"
+        self._exact = exact
+        self._symmetric = keyBits if symmetric else 0
+        self._zobrist = symmetricTable( keyBits ) if symmetric else zobristTable( keyBits )
+        self._key = self.computeKey()
+
+        #   What happened in the last search,
+        #   and how often the exact memento was rebuilt
+        self._search = {}
+        self._resorts = 0
+        self._rehashes = 0
+
+        #   The safe moves to make automatically,
+        #   and whether to move stacks in one turn
+        self.setRules( rules )
+        self._supermoves = supermoves
+
+    def cascades(self):
+        """The cascades as lists of cards, bottom to top."""
+        stride = self._stride
+        return [list(self._cards[c * stride:c * stride + length]) for c, length in enumerate(self._lengths)]
+
+    def isCellIndex(self, idx):
+        return idx >= self._ncascades
+
+    def indexOfCell(self, cell):
+        return cell + self._ncascades
+
+    def cellOfIndex(self, idx):
+        return idx - self._ncascades
+
+    def cardOfIndex(self, idx):
+        if idx >= self._ncascades:
+            return self._cells[idx - self._ncascades]
+
+        elif idx < 0:
+            cardSuit = -idx - 1
+            return makeCard( cardSuit, self._foundations[ cardSuit ] )
+
+        else:
+            return self._cards[idx * self._stride + self._lengths[idx] - 1]
+
+    def moveCard(self, move, validate = False):
+        """Move a card at the start location to the finish
+        location using the same location numbering as Board.
+
+        moveCard works in both directions so it can
+        be used to backtrack."""
+        start, finish = move
+        ncascades = self._ncascades
+
+        #   From a foundation
+        if start < 0:
+            foundation = -start - 1
+            if validate:
+                assert foundation < len(self._foundations), f"Move from invalid foundation {foundation}"
+                assert self._foundations[foundation] != noCard, f"Move from empty foundation {foundation}"
+            cardPips = self._foundations[foundation]
+            self._foundations[foundation] = cardPips - 1
+            card = foundation * 13 + cardPips
+
+        #   From a cell
+        elif start >= ncascades:
+            cell = start - ncascades
+            if validate:
+                assert cell < len(self._cells), f"Move from invalid cell {cell}"
+                assert self._cells[cell] != noCard, f"Move from empty cell {cell}"
+            card = self._cells[cell]
+            self._cells[cell] = noCard
+
+            #   Check whether this is now the first free cell
+            if self._firstFree > cell:
+                self._firstFree = cell
+
+        #   From a cascade
+        else:
+            length = self._lengths[start] - 1
+            if validate:
+                assert length >= 0, f"Move from empty cascade {start}"
+            base = start * self._stride
+            card = self._cards[base + length]
+            self._lengths[start] = length
+            if length:
+                self._key ^= self._zobrist[card * 53 + self._cards[base + length - 1] + 1]
+            else:
+                self._key ^= self._zobrist[card * 53]
+                self._resort = True
+
+        #   To a foundation
+        if finish < 0:
+            foundation = -finish - 1
+            cardPips = card % 13
+            if validate:
+                assert foundation < len(self._foundations), f"Move to invalid foundation {foundation}"
+                assert foundation == suit(card), f"Move of {formatCard(card)} to the wrong foundation {foundation}"
+                assert self._foundations[foundation] == cardPips - 1, f"Move of {formatCard(card)} to foundation {foundation} not onto previous card {formatCard(makeCard(foundation, self._foundations[foundation]))}"
+            self._foundations[foundation] = cardPips
+
+        #   To a cell
+        elif finish >= ncascades:
+            cells = self._cells
+            cell = finish - ncascades
+            if validate:
+                assert cell < len(cells), f"Move to invalid cell {cell}"
+                assert cells[cell] == noCard, f"Move to occupied cell {formatCard(cells[cell])}"
+            cells[cell] = card
+
+            #   Update the first free cell
+            if cell == self._firstFree:
+                firstFree = cell + 1
+                while firstFree < len(cells) and cells[firstFree] != noCard:
+                    firstFree += 1
+                self._firstFree = firstFree
+
+        #   To a cascade
+        else:
+            length = self._lengths[finish]
+            base = finish * self._stride
+            if validate and length:
+                assert self._cards[base + length - 1] == card + 1, f"Move of {formatCard(card)} to cascade {finish} not onto subsequent card {formatCard(self._cards[base + length - 1])}"
+            if length:
+                self._key ^= self._zobrist[card * 53 + self._cards[base + length - 1] + 1]
+            else:
+                self._key ^= self._zobrist[card * 53]
+                self._resort = True
+            self._cards[base + length] = card
+            self._lengths[finish] = length + 1
+
+        #   Need to rehash after moving
+        self._rehash = True
+
+        if validate:
+            self.checkCards()
+            assert self._key == self.computeKey(), f"Position key out of date after move {move}"
+
+        return move
+
+    def moveToFoundations( self, validate = False, move = None ):
+        """Move all cards that can cover aces,
+        and then make any moves allowed by the safe rules (see Board.safeMoves).
+        Return a list of the moves.
+        This list should be treated as a single unit."""
+        moves = []
+        foundations = self._foundations
+        cells = self._cells
+        zobrist = self._zobrist
+        key = self._key
+        cards = self._cards
+        lengths = self._lengths
+        stride = self._stride
+        ncascades = self._ncascades
+
+        #   The moves are inlined, so we have to do the bookkeeping
+        moved = len(moves) - 1
+        while moved != len(moves):
+            moved = len(moves)
+
+            for cell, card in enumerate(cells):
+                if card == noCard: continue
+
+                #   Can we remove it?
+                cardSuit = card // 13
+                cardPips = card % 13
+                if foundations[cardSuit] == cardPips - 1:
+                    foundations[cardSuit] = cardPips
+                    cells[cell] = noCard
+                    if self._firstFree > cell: self._firstFree = cell
+                    moves.append( (cell + ncascades, -cardSuit - 1, ) )
+
+            base = -1
+            for start in range(ncascades):
+                length = lengths[start]
+                while length:
+                    card = cards[base + length]
+                    cardSuit = card // 13
+                    cardPips = card % 13
+                    #   Can we remove it?
+                    if foundations[cardSuit] != cardPips - 1: break
+
+                    foundations[cardSuit] = cardPips
+                    length -= 1
+                    key ^= zobrist[card * 53 + cards[base + length] + 1] if length else zobrist[card * 53]
+                    moves.append( (start, -cardSuit - 1, ) )
+
+                if length != lengths[start]:
+                    lengths[start] = length
+                    if not length: self._resort = True
+                base += stride
+
+        if moves:
+            self._key = key
+            self._rehash = True
+
+        if validate:
+            self.checkCards()
+            assert self._key == self.computeKey(), "Position key out of date after moving to foundations"
+
+        if self._rules: moves.extend( self.safeMoves( move, validate ) )
+
+        return moves
+
+    def isStacked(self, start):
+        length = self._lengths[start]
+        top = start * self._stride + length - 1
+        return length > 1 and self._cards[top] == self._cards[top - 1] - 1
+
+    def isKingStack(self, start):
+        length = self._lengths[start]
+        if not length: return False
+
+        cards = self._cards
+        base = start * self._stride
+        if cards[base] % 13 != king: return False
+
+        for row in range(base + 1, base + length):
+            if cards[row - 1] != cards[row] + 1: return False
+
+        return True
+
+    def reindex(self):
+        """There is no move index to rebuild: the moves are found from the arrays."""
+        pass
+
+    def emptyCascades(self):
+        """The empty cascades, in order."""
+        return [c for c, length in enumerate(self._lengths) if not length]
+
+    def movableStack(self, cascade):
+        """Whether a stacked cascade should be moved at all (see Board.movableStack)."""
+        return self._cells.count( noCard ) >= len( cascade ) or not isKingStack( cascade )
+
+    def enumerateFinishCascades(self, start, card):
+        """Enumerate all the finish cascades for a card."""
+        moves = []
+
+        lengths = self._lengths
+        stride = self._stride
+        fromCell = start >= self._ncascades
+        for finish, length in enumerate(lengths):
+            if start == finish: continue
+
+            if length:
+                #   We can't stack a king on an ace because
+                #   exposed aces are always removed first
+                if self._cards[finish * stride + length - 1] == card + 1:
+                    moves.append((start, finish,))
+
+            #   Don't move between empty cascades - NOP
+            elif fromCell or lengths[start] > 1:
+                moves.append((start, finish,))
+
+        return moves
+
+    def enumerateMoves(self):
+        """Enumerate all the legal moves that can be made,
+        in the same order as Board.enumerateMoves."""
+        cards = self._cards
+        lengths = self._lengths
+        stride = self._stride
+        ncascades = self._ncascades
+
+        #   Classify each cascade once
+        openCells = 0
+        if self._firstFree < len(self._cells):
+            openCells = self._cells.count( noCard )
+
+        tops = []
+        stacked = []
+        where = {}
+        empties = []
+        base = -1
+        for start, length in enumerate(lengths):
+            if length:
+                top = cards[base + length]
+                tops.append( top )
+                where[top] = start
+                if length > 1 and top == cards[base + length - 1] - 1:
+                    #   If the stack is anchored on a king, don't move anything
+                    stacked.append( 1 if openCells >= length or not self.isKingStack( start ) else -1 )
+                else:
+                    stacked.append( 0 )
+            else:
+                tops.append( noCard )
+                stacked.append( 0 )
+                empties.append( start )
+            base += stride
+
+        #   3. Move from cascades to the first open cell
+        stacked_to_cell = []        #   Stacked card to free cell
+        isolate_to_cell = []        #   Isolate card to free cell
+        if self._firstFree < len(self._cells):
+            finish = self._firstFree + ncascades
+            for start, card in enumerate(tops):
+                if card == noCard:
+                    continue
+
+                elif stacked[start]:
+                    if stacked[start] > 0:
+                        stacked_to_cell.append( (start, finish,) )
+
+                else:
+                    isolate_to_cell.append( (start, finish,) )
+
+        #   2. Move from cells to cascades
+        cell_to_cascade = []        #   Cell card to any cascade
+        for cell, card in enumerate(self._cells):
+            if card == noCard: continue
+            start = cell + ncascades
+            under = where.get( card + 1 )
+            if empties:
+                finishes = empties if under is None else sorted( empties + [under] )
+                cell_to_cascade.extend( [(start, finish,) for finish in finishes] )
+            elif under is not None:
+                cell_to_cascade.append( (start, under,) )
+
+        #   1. Move from cascades to cascades
+        stacked_to_open = []        #   Stacked card to open cascade
+        isolate_to_cascade = []     #   Isolate card to any cascade
+        for start, card in enumerate(tops):
+            if card == noCard or stacked[start] < 0: continue
+
+            moves = stacked_to_open if stacked[start] else isolate_to_cascade
+            under = where.get( card + 1 )
+
+            #   Don't move between empty cascades - NOP
+            if empties and lengths[start] > 1:
+                finishes = empties if under is None else sorted( empties + [under] )
+                moves.extend( [(start, finish,) for finish in finishes] )
+            elif under is not None:
+                moves.append( (start, under,) )
+
+        #   Build the list in reverse order
+        #   because we will pop choices from the back.
+
+        moves = stacked_to_cell
+        moves.extend( isolate_to_cell )
+        moves.extend( cell_to_cascade )
+        moves.extend( stacked_to_open )
+        moves.extend( isolate_to_cascade )
+        if self._supermoves: moves.extend( self.enumerateSupermoves() )
+
+        return moves
+
+    def iterateMoves(self):
+        """Generate the moves of enumerateMoves in the order
+        they would be popped from its list. The moves are not
+        worked out lazily, as the arrays make building the list cheap."""
+        return reversed( self.enumerateMoves() )
+
+    def memento(self):
+        """The position key of the board, which ignores the order of the cascades.
+        Keys are random 64 or 128 bit numbers (keyBits), so different positions
+        can collide, which is very unlikely with 128 bits but possible.
+        In exact mode, this is the lazily computed tuple of sorted cascades,
+        which is the only mode that can never collide."""
+        if not self._exact: return self.symmetricKey() if self._symmetric else self._key
+
+        #   If the cascades are out of order, then re-sort them
+        if self._resort:
+            stride = self._stride
+            cards = self._cards
+            lengths = self._lengths
+            self._order.sort(key = lambda c: cards[c * stride] if lengths[c] else noCard)
+            self._resort = False
+            self._rehash = True
+            self._resorts += 1
+
+        #   If cards moved, rebuild the sorted cascades
+        if self._rehash:
+            stride = self._stride
+            cards = self._cards
+            lengths = self._lengths
+            self._memento = tuple(bytes(cards[c * stride:c * stride + lengths[c]]) for c in self._order)
+            self._rehash = False
+            self._rehashes += 1
+
+        return self._memento
+
+if __name__ == '__main__':
+    b = CompactBoard(range(0,52))
+    print(b)
+    print(b.solve())
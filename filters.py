@@ -0,0 +1,31 @@
+#!/usr/bin/python3
+
+import board
+
+def buriedAces( b, limit = 17 ):
+    """Reject boards whose aces are buried under more than limit cards in total.
+    This is a heuristic: a fresh deal always has moves into the empty cells,
+    so no cheap check can prove it unsolvable, but only about a third
+    of such deals can be solved, against three quarters of all deals."""
+    buried = 0
+    for cascade in b.cascades():
+        for row, card in enumerate(cascade):
+            if board.pips(card) == board.ace:
+                buried += len(cascade) - row - 1
+
+    return buried > limit
+
+defaultFilters = ( ( 'aces', buriedAces, ), )
+
+def reject( b, filters = defaultFilters ):
+    """Return the name of the first filter that rejects the board, or None.
+    The filters see the board after the automatic moves to the foundations,
+    but the board is returned to its starting position."""
+    moves = b.moveToFoundations()
+    try:
+        for name, check in filters:
+            if check( b ): return name
+        return None
+
+    finally:
+        b.backtrack( moves )
@@ -0,0 +1,143 @@
+#!/usr/bin/python3
+
+import argparse
+import collections
+import concurrent.futures
+import json
+import os
+import sys
+import time
+
+import batch
+import board
+import compact
+import filters
+
+def tryDeal( seed, maxNodes = 3000, improvements = 1, minLength = None, maxLength = None, minNodes = None,
+             layout = 'board', checks = filters.defaultFilters, cells = None, cascades = None ):
+    """Try the shuffled deal of a seed, returning ( seed, deck, solution, stats, )
+    if it is solvable within maxNodes positions and in the difficulty band,
+    or the reason it was rejected (the name of a filter, the limit that
+    stopped the search, 'search', 'short', 'long' or 'easy').
+
+    The band limits the length of the solution found and the number of
+    positions searched to find it. The stats are the searchStats of the solve.
+    The deals can have other numbers of cells and cascades."""
+    deck = batch.shuffledDeal( seed )[1]
+    b = ( compact.CompactBoard if layout == 'compact' else board.Board )( deck, cells = cells, cascades = cascades )
+
+    #   Cheap checks first
+    reason = filters.reject( b, checks )
+    if reason: return reason
+
+    found = 0
+    def callback( **kwargs ):
+        nonlocal found
+        found += 1
+        return found < improvements
+
+    solution = b.solve( callback, maxNodes = maxNodes or None, callbackEvery = 0 )
+    stats = b.searchStats()
+    if not solution: return stats['stopped'] or 'search'
+
+    if minLength is not None and len(solution) < minLength: return 'short'
+    if maxLength is not None and len(solution) > maxLength: return 'long'
+    if minNodes is not None and stats['nodes'] < minNodes: return 'easy'
+
+    return ( seed, deck, solution, stats, )
+
+def _tryDeal( task ):
+    seed, options = task
+    return tryDeal( seed, **options )
+
+def generateDeals( count, seed = 0, jobs = None, chunksize = 4, rejected = None, **options ):
+    """Yield ( seed, deck, solution, stats, ) for the first count seeds from seed on
+    whose shuffled deals tryDeal accepts, in the order of the seeds.
+    The deals only depend on the seeds and the options, not on the number of jobs.
+    The reasons the other seeds were rejected are counted in rejected.
+
+    The seeds are tried in rounds by a pool of worker processes,
+    so a round may try a few more seeds than are needed."""
+    if rejected is None: rejected = collections.Counter()
+    jobs = jobs or os.cpu_count()
+    generated = 0
+    with concurrent.futures.ProcessPoolExecutor( max_workers = jobs ) as executor:
+        while generated < count:
+            #   Enough seeds to keep the workers busy
+            seeds = range( seed, seed + jobs * chunksize )
+            seed += len(seeds)
+            for result in executor.map( _tryDeal, ( ( candidate, options, ) for candidate in seeds ), chunksize = chunksize ):
+                if isinstance( result, str ):
+                    rejected[result] += 1
+                    continue
+
+                yield result
+                generated += 1
+                if generated == count: return
+
+def formatDeal( deal, cells = None, cascades = None ):
+    """A generated deal as a JSON line, with the solution encoded in hexadecimal.
+    The numbers of cells and cascades are recorded, as the solution depends on them."""
+    seed, deck, solution, stats = deal
+    nsuits = board.suit( len(deck) )
+    return json.dumps( {
+        'seed': seed,
+        'deck': ' '.join( board.formatCard( card ) for card in deck ),
+        'cells': nsuits if cells is None else cells,
+        'cascades': nsuits * 2 if cascades is None else cascades,
+        'length': len(solution),
+        'solution': board.encodeSolution( solution ).hex(),
+        'nodes': stats['nodes'],
+        'seconds': round( stats['seconds'], 6 ),
+    } )
+
+def parseDeal( line ):
+    """Read a JSON line of formatDeal back into ( seed, deck, solution, cells, cascades, ).
+    Lines without the numbers of cells and cascades are for the standard layout."""
+    record = json.loads( line )
+    deck = board.parseDeck( record['deck'] )
+    nsuits = board.suit( len(deck) )
+    return ( record['seed'], deck, board.decodeSolution( bytes.fromhex( record['solution'] ) ),
+             record.get( 'cells', nsuits ), record.get( 'cascades', nsuits * 2 ), )
+
+def run( count, output, seed = 0, jobs = None, rejected = None, **options ):
+    """Generate deals and write them to the output as JSON lines as they are found.
+    Returns the number of deals written."""
+    written = 0
+    for deal in generateDeals( count, seed, jobs, rejected = rejected, **options ):
+        output.write( formatDeal( deal, options.get( 'cells' ), options.get( 'cascades' ) ) )
+        output.write( '\n' )
+        output.flush()
+        written += 1
+    return written
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generates solvable Baker's Game deals from seeds and writes them as JSON lines")
+    parser.add_argument( 'count', type=int, help="The number of deals to generate")
+    parser.add_argument( '--seed', dest='seed', type=int, default=0, help="The first seed to try")
+    parser.add_argument( '-o', '--output', dest='output', type=str, help="The file to append the deals to (default stdout)")
+    parser.add_argument( '-j', '--jobs', dest='jobs', type=int, help="The number of worker processes (default all cores)")
+    parser.add_argument( '-i', '--improve', dest='improvements', type=int, default=1, help="The number of improvements to try when solving")
+    parser.add_argument( '--max-nodes', dest='maxNodes', type=int, default=3000, help="Give up on deals after searching this many positions (0 for no limit)")
+    parser.add_argument( '--min-length', dest='minLength', type=int, help="Reject deals solved in fewer moves")
+    parser.add_argument( '--max-length', dest='maxLength', type=int, help="Reject deals solved in more moves")
+    parser.add_argument( '--min-nodes', dest='minNodes', type=int, help="Reject deals solved after searching fewer positions")
+    parser.add_argument( '-c', '--compact', dest='compact', action="store_true", help="Solve using the compact board layout")
+    parser.add_argument( '--no-filters', dest='filters', action="store_false", help="Don't reject deals with heuristic filters")
+    parser.add_argument( '--cells', dest='cells', type=int, choices=range(1, 5), help="The number of cells (default 4)")
+    parser.add_argument( '--cascades', dest='cascades', type=int, choices=range(6, 11), help="The number of cascades (default 8)")
+    args = parser.parse_args()
+
+    output = open( args.output, "a" ) if args.output else sys.stdout
+    rejected = collections.Counter()
+    start = time.perf_counter()
+    written = run( args.count, output, args.seed, args.jobs, rejected,
+                   maxNodes = args.maxNodes, improvements = args.improvements,
+                   minLength = args.minLength, maxLength = args.maxLength, minNodes = args.minNodes,
+                   layout = 'compact' if args.compact else 'board', checks = filters.defaultFilters if args.filters else (),
+                   cells = args.cells, cascades = args.cascades )
+    if args.output: output.close()
+
+    print( f"Generated {written} deals in {time.perf_counter() - start:.3f}s", file = sys.stderr )
+    if rejected:
+        print( "Rejected: " + ", ".join( f"{count} by {reason}" for reason, count in rejected.most_common() ), file = sys.stderr )
@@ -1,10 +1,18 @@
 #!/usr/bin/python3
 
 import argparse
+import collections
+import multiprocessing
 import random
 import sys
 
 import board
+import cache
+import compact
+import filters
+import ordering
+import parallel
+import table
 
 def formatIndex( b, idx ):
     if b.isFoundationIndex( idx ):
@@ -23,6 +31,9 @@ def formatMove( b, move ):
 
     return f"{board.formatCard(card)}: {formatIndex( b, start)} => {formatIndex( b, finish )}"
 
+def formatStats( stats ):
+    return ', '.join( f"{name}: {value:.3f}" if isinstance( value, float ) else f"{name}: {value}" for name, value in stats.items() )
+
 def onSolved( improvements = 100 ):
     untried = improvements
 
@@ -47,21 +58,47 @@ def onSolved( improvements = 100 ):
 
     return callback
 
-def generateSolvableBoard( improvements = 1 ):
+def generateSolvableBoard( improvements = 1, layout = board.Board, visited = None, strategy = 'dfs', weight = 2, maxNodes = 0, checks = (), timers = 0, rng = random ):
+    """Shuffle decks with the rng until one can be solved.
+    Deals that fail the checks (see filters) or take more than maxNodes
+    positions to solve are skipped, so both make the deals easier than usual.
+    See generate.generateDeals for making many deals from seeds."""
     attempt = 0
+    rejected = collections.Counter()
     while True:
         deck = [*range(0,52)]
-        random.shuffle(deck)
-        b = board.Board(deck)
-        solution = b.solve( onSolved( improvements ) )
+        rng.shuffle(deck)
+        b = layout(deck)
         attempt = attempt + 1
-        if b.solved():
+
+        #   Cheap checks first
+        reason = filters.reject( b, checks )
+        if reason:
+            rejected[reason] += 1
+            continue
+
+        if visited is not None:
+            visited.clear()
+            visited.resetStats()
+        callback = onSolved( improvements ) if strategy == 'dfs' else None
+        solution = b.solve( callback, visited = visited, strategy = strategy, weight = weight, maxNodes = maxNodes or None, callbackEvery = 0, timers = timers )
+        if solution:
             plural = "s" if attempt != 1 else ""
             print( f"Found a {len(solution)} move game after {attempt} attempt{plural}" )
+            if timers: print( f"Search: {formatStats( b.searchStats() )}" )
+            if rejected:
+                print( "Rejected: " + ", ".join( f"{count} by {reason}" for reason, count in rejected.most_common() ) )
             return (deck, solution, )
 
-def playSolution( deck, solution, name = 'generated' ):
-    b = board.Board( deck )
+        rejected[b.searchStats()['stopped'] or 'search'] += 1
+
+def playSolution( deck, solution, name = 'generated', layout = board.Board ):
+    """Play a solution, given as a list of turns
+    or the bytes of board.encodeSolution, on the board layout made from the deck."""
+    if isinstance( solution, ( bytes, bytearray, ) ):
+        solution = board.decodeSolution( solution )
+
+    b = layout( deck )
 
     print( f"Playing {name} deal" )
 
@@ -91,7 +128,55 @@ if __name__ == '__main__':
     parser.add_argument( 'files', metavar='file', type=str, nargs='*', help="Deck files to read and play.")
     parser.add_argument( '-i', '--improve', dest='improvements', type=int, default=1, help="The number of improvements to try when solving")
     parser.add_argument( '-v', '--validate', dest='validate', action="store_true", help="Validate each move")
+    parser.add_argument( '-c', '--compact', dest='compact', action="store_true", help="Solve using the compact board layout")
+    parser.add_argument( '-x', '--exact', dest='exact', action="store_true", help="Use exact positions instead of position keys to detect loops")
+    parser.add_argument( '-y', '--symmetric', dest='symmetric', action="store_true", help="Treat positions that only differ by relabelling the suits as the same")
+    parser.add_argument( '--safe', dest='rules', action='append', default=[], choices=board.Board.safeRules, help="Also make the moves of this safe rule automatically (can be repeated)")
+    parser.add_argument( '--supermoves', dest='supermoves', action="store_true", help="Move stacked runs of cards in a single turn")
+    parser.add_argument( '--cells', dest='cells', type=int, choices=range(1, 5), help="The number of cells (default 4)")
+    parser.add_argument( '--cascades', dest='cascades', type=int, choices=range(6, 11), help="The number of cascades (default 8)")
+    parser.add_argument( '-k', '--key-bits', dest='keyBits', type=int, default=64, choices=(64, 128,), help="The size of the position keys used to detect loops")
+    parser.add_argument( '-s', '--strategy', dest='strategy', default='dfs', choices=('dfs', 'astar', 'ida',), help="Search depth first, best first for a short solution or iteratively deepening for a shortest solution")
+    parser.add_argument( '-w', '--weight', dest='weight', type=float, default=2, help="The heuristic weight for best first search")
+    parser.add_argument( '--table-entries', dest='tableEntries', type=int, help="Remember positions in a fixed size table with this many entries")
+    parser.add_argument( '--table-policy', dest='tablePolicy', default='twotier', choices=table.TranspositionTable.policies, help="The replacement policy for the position table")
+    parser.add_argument( '-j', '--jobs', dest='jobs', type=int, help="Split the depth first search of each file over this many processes")
+    parser.add_argument( '--seed', dest='seed', type=int, help="Seed the shuffles of the generated deals")
+    parser.add_argument( '--max-nodes', dest='maxNodes', type=int, default=0, help="Give up on generated deals after searching this many positions (default no limit), which favours easy deals")
+    parser.add_argument( '--filters', dest='filters', action="store_true", help="Reject generated deals with heuristic filters, which favours easy deals")
+    parser.add_argument( '--stats', dest='timers', action="store_const", const=16, default=0, help="Print the search statistics, timing a sample of the move generation")
+    parser.add_argument( '--replay', dest='replay', type=str, help="Replay an encoded solution file instead of solving the deck file")
+    parser.add_argument( '--save-solution', dest='saveSolution', type=str, help="Save the encoded solution of the deck file")
+    parser.add_argument( '--reopen', dest='reopen', action="store_true", help="Search positions again when they are reached by shorter paths while improving")
+    parser.add_argument( '--order', dest='order', choices=ordering.orderers.keys(), help="Order the moves of the depth first search with this orderer")
+    parser.add_argument( '--cache', dest='cache', type=str, help="Look up and store the solutions of the deck files in this SQLite file")
     args = parser.parse_args()
+    assert not ( args.replay or args.saveSolution ) or len(args.files) == 1, "Solution files need a single deck file"
+
+    #   The workers of a parallel search only take the layout of the board
+    if args.jobs:
+        ignored = [name for name, used in ( ( '--symmetric', args.symmetric, ), ( '--safe', args.rules, ), ( '--supermoves', args.supermoves, ),
+                                            ( '--table-entries', args.tableEntries, ), ( '--strategy', args.strategy != 'dfs', ),
+                                            ( '--improve', args.improvements > 1, ), ( '--order', args.order, ),
+                                            ( '--reopen', args.reopen, ), ( '--validate', args.validate, ), ) if used]
+        if ignored: parser.error( f"--jobs can't be used with {', '.join( ignored )}" )
+
+    visited = None
+    if args.tableEntries:
+        assert not args.exact, "Position tables need position keys"
+        visited = table.TranspositionTable( args.tableEntries, policy = args.tablePolicy, keyBits = args.keyBits )
+
+    #   The cache is keyed by the deal alone, and the rules change the turns
+    if args.cache and ( args.cells or args.cascades ):
+        parser.error( "The solution cache only holds solutions with the standard cells and cascades" )
+    if args.cache and ( args.supermoves or args.rules ):
+        parser.error( "The solution cache only holds solutions without supermoves or safe rules" )
+    solutions = cache.SolutionCache( args.cache ) if args.cache else None
+
+    layoutClass = compact.CompactBoard if args.compact else board.Board
+    layout = lambda deck: layoutClass( deck, exact = args.exact, keyBits = args.keyBits, symmetric = args.symmetric, rules = args.rules, supermoves = args.supermoves,
+                                       cells = args.cells, cascades = args.cascades )
+    variant = lambda deck: board.Board( deck, cells = args.cells, cascades = args.cascades )
 
     if args.files:
         for filename in args.files:
@@ -101,12 +186,52 @@ if __name__ == '__main__':
                 print( f"Unable to parse file {filename}:", str( msg ) )
                 raise
 
-            b = board.Board(deck)
-            solution = b.solve( onSolved( args.improvements ), args.validate )
+            if args.replay:
+                with open( args.replay, "rb" ) as solutionFile:
+                    playSolution( deck, solutionFile.read(), filename, variant )
+                continue
+
+            b = layout(deck)
+            if visited is not None:
+                visited.clear()
+                visited.resetStats()
+
+            #   Serve known results, unless we want to improve them
+            cached = solutions.get( deck ) if solutions is not None else None
+            if cached and ( cached['unsolvable'] or cached['optimal'] or ( args.improvements <= 1 and args.strategy != 'ida' ) ):
+                solution = cached['solution']
+                print( f"Cached after {cached['nodes']} positions", end = '' )
+
+            else:
+                if args.jobs:
+                    solution = parallel.solve( deck, args.jobs, layout = layoutClass, exact = args.exact, keyBits = args.keyBits,
+                                              cells = args.cells, cascades = args.cascades )
+                elif args.strategy == 'dfs':
+                    #   Resume improving from the cached solution
+                    incumbent = multiprocessing.Value( 'i', cached['length'] ) if cached else None
+                    solution = b.solveDepthFirst( onSolved( args.improvements ), args.validate, visited, incumbent = incumbent, callbackEvery = 0, timers = args.timers, reopen = args.reopen,
+                                                  orderer = ordering.makeOrderer( args.order ) if args.order else None )
+                else:
+                    solution = b.solve( None, args.validate, visited, args.strategy, args.weight, timers = args.timers )
+
+                if solutions is not None:
+                    stats = b.searchStats() if not args.jobs else { 'nodes': 0, 'seconds': 0.0, 'stopped': None, }
+                    #   The lower bound is not admissible with supermoves
+                    solutions.put( deck, solution, optimal = bool( solution ) and args.strategy == 'ida' and not args.jobs and not args.supermoves,
+                                   unsolvable = not solution and not cached and not stats['stopped'],
+                                   nodes = stats['nodes'], seconds = stats['seconds'], strategy = args.strategy )
+                    if cached and not solution: solution = cached['solution']
+
             print()
+            if args.timers and not args.jobs and b.searchStats(): print( f"Search: {formatStats( b.searchStats() )}" )
+            if visited is not None: print( f"Table: {visited}" )
             if solution:
-                print( f"Found a {len(solution)} move solution for {filename}:" )
-                playSolution( deck, solution, filename )
+                shortest = "shortest " if args.strategy == 'ida' and not args.supermoves else ""
+                print( f"Found a {shortest}{len(solution)} move solution for {filename}:" )
+                if args.saveSolution:
+                    with open( args.saveSolution, "wb" ) as solutionFile:
+                        solutionFile.write( board.encodeSolution( solution ) )
+                playSolution( deck, solution, filename, variant )
 
             else:
                 print( "*" * 23 )
@@ -115,6 +240,9 @@ if __name__ == '__main__':
 
     else:
         playing = True
+        rng = random.Random( args.seed ) if args.seed is not None else random
         while( playing ):
-            deck, solution = generateSolvableBoard( args.improvements )
-            playing = playSolution(deck, solution)
+            deck, solution = generateSolvableBoard( args.improvements, layout, visited, args.strategy, args.weight,
+                                                    args.maxNodes, filters.defaultFilters if args.filters else (), args.timers, rng )
+            if visited is not None: print( f"Table: {visited}" )
+            playing = playSolution(deck, solution, layout = variant)
@@ -0,0 +1,96 @@
+#!/usr/bin/python3
+
+import board
+import positions
+
+class Orderer:
+    """Orders the moves of a position for the depth first search.
+    Moves are sorted by score, with the best last because the search
+    pops moves from the back. Ties keep the order of enumerateMoves,
+    so this base class searches exactly as the board does on its own.
+
+    Subclasses override score, and can learn from the solutions
+    the search finds, which are passed to learn in the same way
+    as positions.PositionDatabase.record."""
+
+    name = 'moves'
+
+    def prepare(self, b):
+        """Work out anything the scores of a position share."""
+        return None
+
+    def score(self, b, move, context):
+        return 0
+
+    def order(self, b, moves):
+        context = self.prepare( b )
+        return sorted( moves, key = lambda move: self.score( b, move, context ) )
+
+    def learn(self, b, solution, depth):
+        pass
+
+class FoundationOrderer(Orderer):
+    """Prefer moves that uncover the next card a foundation needs,
+    then moves out of cascades that hold one, shallowest first."""
+
+    name = 'foundations'
+
+    def prepare(self, b):
+        #   The next card of each suit and the depth of the shallowest one in each cascade
+        tops = [b.cardOfIndex( b.indexOfFoundation( cardSuit ) ) for cardSuit in range(len(board.suitChars))]
+        needed = { top + 1 for top in tops if board.pips( top ) < len(board.pipsChars) - 1 }
+        depths = []
+        for cascade in b.cascades():
+            depth = None
+            for row in range( len(cascade) - 1, -1, -1 ):
+                if cascade[row] in needed:
+                    depth = len(cascade) - row - 1
+                    break
+            depths.append( depth )
+        return depths
+
+    def score(self, b, move, context):
+        start = move[0]
+        if b.isCellIndex( start ): return 0
+        depth = context[start]
+        if depth is None: return 0
+
+        #   Supermoves take several cards at once
+        moved = move[2] if len(move) > 2 else 1
+        if depth <= moved: return 100
+        return 50 - depth
+
+class HistoryOrderer(Orderer):
+    """Prefer the moves (by card and kind of destination, see positions.moveCode)
+    that appeared most often in the solutions found so far,
+    which carries over between searches that share the orderer."""
+
+    name = 'history'
+
+    def __init__(self):
+        self.counts = {}
+
+    def score(self, b, move, context):
+        return self.counts.get( positions.moveCode( b, move ), 0 )
+
+    def learn(self, b, solution, depth):
+        """Count the moves of a solution.
+        The board is at the end of the first depth turns and is left there."""
+        for turn in solution[depth:]:
+            for move in turn:
+                b.moveCard( move )
+
+        for done in range( len(solution) - 1, 0, -1 ):
+            turn = solution[done]
+            b.backtrack( turn.copy() )
+            code = positions.moveCode( b, turn[0] )
+            self.counts[code] = self.counts.get( code, 0 ) + 1
+
+        for turn in solution[1:depth]:
+            for move in turn:
+                b.moveCard( move )
+
+orderers = { orderer.name: orderer for orderer in ( Orderer, FoundationOrderer, HistoryOrderer, ) }
+
+def makeOrderer( name ):
+    return orderers[name]()
@@ -0,0 +1,135 @@
+#!/usr/bin/python3
+
+import argparse
+import concurrent.futures
+import multiprocessing
+
+import board
+import compact
+
+def splitRoot( b, depth = 1 ):
+    """Split the search of a board into subtrees by expanding
+    the first few levels of moves in depth first order.
+
+    Returns the prefixes (lists of turns, starting with the
+    automatic moves of the root) that lead to the distinct unsolved
+    positions at the split depth, and the shortest solution
+    found on the way (or an empty list).
+    The board is returned to the starting position,
+    apart from the automatic moves of the root."""
+    prefixes = []
+    solution = []
+
+    history = [b.moveToFoundations()]
+    if b.solved(): return prefixes, history
+
+    visited = {b.memento()}
+
+    def expand():
+        nonlocal solution
+        level = b.enumerateMoves()
+        while level:
+            move = level.pop()
+            turn = b.makeMove( move )
+            turn.extend( b.moveToFoundations( False, move ) )
+            history.append( turn )
+
+            memento = b.memento()
+            if b.solved():
+                if not solution or len(history) < len(solution):
+                    solution = [turn.copy() for turn in history]
+
+            elif memento not in visited:
+                visited.add( memento )
+                if len(history) > depth:
+                    prefixes.append( [turn.copy() for turn in history] )
+                else:
+                    expand()
+
+            b.backtrack( history.pop() )
+
+    expand()
+
+    return prefixes, solution
+
+#   Shared with the workers by the pool initializer
+incumbent = None
+cancel = None
+
+def _initWorker( sharedIncumbent, sharedCancel ):
+    global incumbent, cancel
+    incumbent = sharedIncumbent
+    cancel = sharedCancel
+
+def _searchSubtree( deck, prefix, target, layout, exact, keyBits, cells, cascades ):
+    """Solve the subtree below a prefix in a worker process,
+    returning the encoded solution to keep the result small."""
+    if cancel.is_set(): return b''
+
+    b = layout( deck, exact = exact, keyBits = keyBits, cells = cells, cascades = cascades )
+    for turn in prefix:
+        for move in turn:
+            b.moveCard( move )
+
+    #   Only called when a shorter solution is found
+    def callback( **kwargs ):
+        #   Stop everyone when we have a good enough solution
+        solution = kwargs['solution']
+        if solution and ( target is None or len(solution) <= target ):
+            cancel.set()
+            return False
+        return True
+
+    return board.encodeSolution( b.solveDepthFirst( callback, prefix = prefix, incumbent = incumbent,
+                                                    limits = board.SearchLimits( cancel = cancel ), callbackEvery = 0 ) )
+
+def solve( deck, jobs = None, depth = 1, target = None, layout = board.Board, exact = False, keyBits = 64, cells = None, cascades = None ):
+    """Solve a deal by searching the subtrees below the first few levels
+    of moves (see splitRoot) in worker processes.
+
+    The workers share the length of the shortest solution found so far
+    so they can cut long lines early. Without a target, the first solution
+    stops all the workers. Otherwise they keep looking for shorter solutions
+    until one has at most target turns or the subtrees are exhausted.
+    Each worker only remembers the positions in its own subtree,
+    so positions reachable from several subtrees can be searched more than once.
+
+    Returns the shortest solution found, or an empty list."""
+    prefixes, solution = splitRoot( layout( deck, exact = exact, keyBits = keyBits, cells = cells, cascades = cascades ), depth )
+    if solution and ( target is None or len(solution) <= target ):
+        return solution
+
+    sharedIncumbent = multiprocessing.Value( 'i', len(solution) )
+    sharedCancel = multiprocessing.Event()
+
+    with concurrent.futures.ProcessPoolExecutor( max_workers = jobs, initializer = _initWorker, initargs = ( sharedIncumbent, sharedCancel, ) ) as executor:
+        futures = [executor.submit( _searchSubtree, deck, prefix, target, layout, exact, keyBits, cells, cascades ) for prefix in prefixes]
+        for future in concurrent.futures.as_completed( futures ):
+            if future.cancelled(): continue
+            found = board.decodeSolution( future.result() )
+            if found and ( not solution or len(found) < len(solution) ):
+                solution = found
+
+            #   Don't start the remaining subtrees
+            if sharedCancel.is_set():
+                for pending in futures: pending.cancel()
+
+    return solution
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Solves Baker's Game deck files using several processes per deal")
+    parser.add_argument( 'files', metavar='file', type=str, nargs='+', help="Deck files to solve.")
+    parser.add_argument( '-j', '--jobs', dest='jobs', type=int, help="The number of worker processes (default all cores)")
+    parser.add_argument( '-d', '--depth', dest='depth', type=int, default=1, help="The number of levels of moves to split the search on")
+    parser.add_argument( '-t', '--target', dest='target', type=int, help="Keep searching until a solution has at most this many moves")
+    parser.add_argument( '-c', '--compact', dest='compact', action="store_true", help="Solve using the compact board layout")
+    args = parser.parse_args()
+
+    for filename in args.files:
+        deck = board.parseDeck( open( filename, "r" ).read() )
+        layout = compact.CompactBoard if args.compact else board.Board
+        solution = solve( deck, args.jobs, args.depth, args.target, layout )
+        if solution:
+            print( f"Found a {len(solution)} move solution for {filename}" )
+        else:
+            print( f"{filename} is unsolvable" )
@@ -0,0 +1,199 @@
+#!/usr/bin/python3
+
+import argparse
+import mmap
+import os
+
+#   Moves are stored by the card moved and the kind of place it goes to,
+#   which does not depend on the order of the cascades or the cells.
+toFoundation = 0
+toCell = 1
+toEmpty = 2
+toCascade = 3
+
+def moveCode( b, move ):
+    """A byte that identifies a move (or supermove) in any arrangement of the position."""
+    start, finish = move[:2]
+    card = b.cascades()[start][-move[2]] if len(move) > 2 else b.cardOfIndex( start )
+    if b.isFoundationIndex( finish ): kind = toFoundation
+    elif b.isCellIndex( finish ): kind = toCell
+    elif not b.cascades()[finish]: kind = toEmpty
+    else: kind = toCascade
+    return card << 2 | kind
+
+class PositionDatabase:
+    """A fixed size table of what is known about positions,
+    shared by every solve (and process) that uses the same file.
+
+    Each entry is a 64 bit word holding the top 48 bits of a position key
+    and a 16 bit value. A value is either dead (the position can't be solved)
+    or the next move of a known solution (see moveCode) and the number
+    of turns left in it, which is capped at 255 (meaning at least that many).
+    Entries are replaced when another position wants their slot,
+    so the table is lossy, and keys can collide, so solutions
+    read from the table are always replayed and checked.
+    Solutions are recorded by the first card move of each turn,
+    so turns made by supermoves can't be finished from the table.
+
+    The table lives in a memory-mapped file, or anonymous memory
+    (shared with forked processes) when no path is given.
+    Existing files keep their size. Without create, the file must exist,
+    so processes sharing a new file should have one process create it first."""
+
+    dead = 0xFFFF
+    maxTurns = 0xFF
+
+    def __init__(self, path = None, entries = None, megabytes = 64, create = True):
+        self._file = None
+        if path and ( not create or os.path.exists( path ) ):
+            self._file = open( path, "r+b" )
+            entries = os.fstat( self._file.fileno() ).st_size // 8
+        elif entries is None:
+            entries = int( megabytes * 1024 * 1024 ) // 8
+
+        #   Round down to a power of two so we can mask the keys
+        size = 2
+        while size * 2 <= entries: size *= 2
+        self._size = size
+        self._mask = size - 1
+
+        if path:
+            if self._file is None:
+                self._file = open( path, "w+b" )
+                self._file.truncate( size * 8 )
+            self._map = mmap.mmap( self._file.fileno(), size * 8 )
+        else:
+            self._map = mmap.mmap( -1, size * 8 )
+        self._entries = memoryview( self._map ).cast( 'Q' )
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.finishes = 0
+
+    def close(self):
+        self._entries.release()
+        self._map.close()
+        if self._file: self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def flush(self):
+        self._map.flush()
+
+    def capacity(self):
+        return self._size
+
+    def __len__(self):
+        return self._size - self._entries.tolist().count( 0 )
+
+    def _locate(self, key):
+        #   Fold wide keys into 64 bits
+        key = ( key ^ ( key >> 64 ) ) & 0xFFFFFFFFFFFFFFFF
+        return key & self._mask, key >> 16
+
+    def get(self, key):
+        """The value stored for a position key, or None."""
+        slot, tag = self._locate( key )
+        entry = self._entries[slot]
+        if entry >> 16 != tag or not entry:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry & 0xFFFF
+
+    def _store(self, key, value):
+        slot, tag = self._locate( key )
+        self._entries[slot] = tag << 16 | value
+        self.stores += 1
+
+    def isDead(self, key):
+        return self.get( key ) == self.dead
+
+    def markDead(self, key):
+        self._store( key, self.dead )
+
+    def markSolvable(self, key, code, turns):
+        """Remember the next move of a solution with this many turns left,
+        unless a shorter one is already known."""
+        turns = min( turns, self.maxTurns )
+        value = self.get( key )
+        if value is not None and value != self.dead and ( value & 0xFF ) <= turns: return
+        self._store( key, code << 8 | turns )
+
+    def record(self, b, solution, depth):
+        """Remember every position of a solution.
+        The board is at the end of the first depth turns and is left there."""
+        for turn in solution[depth:]:
+            for move in turn:
+                b.moveCard( move )
+
+        for done in range( len(solution) - 1, 0, -1 ):
+            turn = solution[done]
+            b.backtrack( turn.copy() )
+            self.markSolvable( b.memento(), moveCode( b, turn[0] ), len(solution) - done )
+
+        for turn in solution[1:depth]:
+            for move in turn:
+                b.moveCard( move )
+
+    def finish(self, b, limit = None):
+        """Follow the stored moves from the board's position to a solution,
+        returning its turns if it has fewer than limit, or None.
+        The board is returned to its position."""
+        turns = []
+        left = None
+        while not b.solved():
+            value = self.get( b.memento() )
+            if value is None or value == self.dead: break
+
+            #   Give up on lines that can't improve or don't get shorter,
+            #   which only happens when keys collide
+            code, remaining = value >> 8, value & 0xFF
+            if limit is not None and remaining < self.maxTurns and len(turns) + remaining >= limit: break
+            if left is not None and left < self.maxTurns and remaining >= left: break
+            left = remaining
+
+            move = next( ( move for move in b.enumerateMoves() if moveCode( b, move ) == code ), None )
+            if move is None: break
+
+            turn = b.makeMove( move )
+            turn.extend( b.moveToFoundations( False, move ) )
+            turns.append( turn )
+
+        solved = b.solved()
+        for turn in reversed( turns ):
+            b.backtrack( turn.copy() )
+
+        if solved and turns and ( limit is None or len(turns) < limit ):
+            self.finishes += 1
+            return turns
+        return None
+
+    def stats(self):
+        """The table counters as a dictionary."""
+        return {
+            'entries': self._size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'finishes': self.finishes,
+        }
+
+    def __str__(self):
+        return ', '.join( f"{name}: {value}" for name, value in self.stats().items() )
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Summarises a Baker's Game position database file")
+    parser.add_argument( 'path', type=str, help="The position database file")
+    args = parser.parse_args()
+
+    with PositionDatabase( args.path ) as positions:
+        values = [entry & 0xFFFF for entry in positions._entries.tolist() if entry]
+        dead = values.count( PositionDatabase.dead )
+        print( f"{positions.capacity()} entries, {len(values)} used: {dead} dead, {len(values) - dead} solvable" )
@@ -0,0 +1,180 @@
+#!/usr/bin/python3
+
+import argparse
+import bisect
+import concurrent.futures
+import json
+import sys
+
+import batch
+import board
+import compact
+
+#   The metrics that are rated, each the harder the larger
+metrics = ( 'firstNodes', 'length', 'branching', 'cells', )
+
+#   The ventiles of each metric over the solved deals of seeds 0-299
+#   (82 of them) and the percentiles of the scores of all 300,
+#   searched for 2000 positions, made by calibrate()
+calibration = {
+    'firstNodes': [106, 144, 187, 227, 249, 278, 324, 405, 432, 471, 514, 523, 553, 601, 638, 695, 807, 894, 947],
+    'length': [49, 59, 64, 78, 89, 95, 100, 102, 106, 131, 149, 157, 168, 175, 194, 254, 276, 298, 408],
+    'branching': [2.934, 3.32, 3.815, 3.981, 4.29, 4.542, 5.091, 5.139, 5.349, 5.734, 6.137, 6.506, 7.042, 7.386, 8.096, 9.443, 10.152, 10.795, 12.897],
+    'cells': [2.182, 2.409, 2.667, 2.898, 2.974, 3.034, 3.05, 3.068, 3.082, 3.119, 3.157, 3.208, 3.243, 3.3, 3.337, 3.389, 3.459, 3.545, 3.59],
+    'score': [0.25, 0.2875, 0.3125, 0.325, 0.3375, 0.35, 0.3625, 0.375, 0.3875, 0.4, 0.4125, 0.425, 0.425, 0.45, 0.475, 0.475, 0.5125, 0.525, 0.5375, 0.55, 0.6, 0.625, 0.6375, 0.6625, 0.6875, 0.725, 0.8, 1.3654, 1.4808, 1.5577, 1.6154, 1.6154, 1.6346, 1.75, 1.7692, 1.7885, 1.7885, 1.8077, 1.8077, 1.8077, 1.8269, 1.8269, 1.8269, 1.8269, 1.8462, 1.8462, 1.8462, 1.8462, 1.8462, 1.8654, 1.8654, 1.8654, 1.8654, 1.8654, 1.8654, 1.8654, 1.8846, 1.8846, 1.8846, 1.8846, 1.8846, 1.8846, 1.8846, 1.8846, 1.8846, 1.9038, 1.9038, 1.9038, 1.9038, 1.9038, 1.9038, 1.9038, 1.9038, 1.9038, 1.9231, 1.9231, 1.9231, 1.9231, 1.9231, 1.9231, 1.9231, 1.9231, 1.9423, 1.9423, 1.9423, 1.9423, 1.9423, 1.9423, 1.9423, 1.9423, 1.9423, 1.9423, 1.9615, 1.9615, 1.9615, 1.9615, 1.9615, 1.9808, 1.9808],
+}
+
+#   The names of the quarters of the ratings
+bands = ( 'easy', 'medium', 'hard', 'expert', )
+
+def measureDeal( deck, maxNodes = 2000, layout = 'board', cells = None, cascades = None ):
+    """Search a deal for maxNodes positions and measure how hard it was:
+
+        status     - 'solved', 'unsolvable' or 'nodes' (the search ran out)
+        nodes      - the positions searched
+        remaining  - the fewest cards left off the foundations in the search
+        firstNodes - the positions visited before the first solution
+        length     - the turns in the shortest solution found
+        branching  - the moves per position searched
+        cells      - the average number of cells in use after each turn
+                     of the shortest solution
+        maxCells   - the most cells in use along it
+
+    The search keeps looking for shorter solutions until it runs out.
+    The calibration is for the standard cells and cascades."""
+    b = ( compact.CompactBoard if layout == 'compact' else board.Board )( deck, cells = cells, cascades = cascades )
+
+    firstNodes = None
+    remaining = len(deck)
+    def callback( **kwargs ):
+        nonlocal firstNodes, remaining
+        b = kwargs['board']
+        remaining = min( remaining, b.remaining() )
+        if firstNodes is None and b.solved(): firstNodes = len(kwargs['visited'])
+        return True
+
+    solution = b.solve( callback, maxNodes = maxNodes )
+    stats = b.searchStats()
+
+    result = {
+        'status': 'solved' if solution else ( stats['stopped'] or 'unsolvable' ),
+        'nodes': stats['nodes'],
+        'remaining': remaining,
+        'branching': round( stats['branching'], 3 ),
+    }
+    if not solution: return result
+
+    #   Replay the solution to see how many cells it needs
+    b = board.Board( deck, cells = cells, cascades = cascades )
+    used = []
+    for turn in solution:
+        for move in turn:
+            b.moveCard( move )
+        used.append( b.usedCells() )
+
+    result['firstNodes'] = firstNodes
+    result['length'] = len(solution)
+    result['cells'] = round( sum( used ) / len(used), 3 )
+    result['maxCells'] = max( used )
+    return result
+
+def score( measures, table = calibration ):
+    """A score that orders deals by difficulty. Solved deals score
+    the average fraction of the solved calibration deals each of their
+    metrics is above, so they score under 1. Deals the search ran out on
+    score 1 plus the fraction of the cards it could not get off the board."""
+    if measures['status'] != 'solved': return 1 + measures['remaining'] / 52
+
+    fractions = []
+    for metric in metrics:
+        ventiles = table[metric]
+        fractions.append( bisect.bisect_left( ventiles, measures[metric] ) / ( len(ventiles) + 1 ) )
+    return sum( fractions ) / len(fractions)
+
+def rate( measures, table = calibration ):
+    """The difficulty rating of a deal's measures, from 0 to 99:
+    the percentage of the calibration deals with lower scores.
+    Unsolvable deals are not rated."""
+    if measures['status'] == 'unsolvable': return None
+    return bisect.bisect_left( table['score'], score( measures, table ) )
+
+def band( rating ):
+    """The name of the band of a rating, or None for unsolvable deals."""
+    if rating is None: return None
+    return bands[rating * len(bands) // 100]
+
+def summarise( name, measures ):
+    result = { 'deal': name, }
+    result.update( measures )
+    result['rating'] = rate( measures )
+    result['band'] = band( result['rating'] )
+    return result
+
+def rateDeal( deal, **options ):
+    """Measure and rate one deal task (see batch.readDeal and batch.shuffledDeal)
+    and summarise it as a dictionary. The options are passed to measureDeal."""
+    name, deck = deal
+    return summarise( name, measureDeal( deck, **options ) )
+
+def measureDeals( deals, jobs = None, chunksize = 4, **options ):
+    """Measure the deals in worker processes, yielding the measures in the order of the deals."""
+    with concurrent.futures.ProcessPoolExecutor( max_workers = jobs ) as executor:
+        for measures in executor.map( _measureDeal, ( ( deal[1], options, ) for deal in deals ), chunksize = chunksize ):
+            yield measures
+
+def _measureDeal( task ):
+    deck, options = task
+    return measureDeal( deck, **options )
+
+def rateDeals( deals, jobs = None, chunksize = 4, **options ):
+    """Rate the deals in worker processes, yielding the results in the order of the deals."""
+    deals = list( deals )
+    for deal, measures in zip( deals, measureDeals( deals, jobs, chunksize, **options ) ):
+        yield summarise( deal[0], measures )
+
+def quantiles( values, count ):
+    values = sorted( values )
+    return [values[len(values) * quantile // count] for quantile in range( 1, count )]
+
+def calibrate( deals, jobs = None, **options ):
+    """Work out the calibration table of the deals: the ventiles
+    of each metric over the solved deals and the percentiles
+    of the scores over the deals that aren't unsolvable."""
+    results = [measures for measures in measureDeals( deals, jobs, **options ) if measures['status'] != 'unsolvable']
+    solved = [result for result in results if result['status'] == 'solved']
+
+    table = {}
+    for metric in metrics:
+        table[metric] = quantiles( [result[metric] for result in solved], 20 )
+    table['score'] = quantiles( [round( score( result, table ), 4 ) for result in results], 100 )
+    return table, len(solved), len(results)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Rates the difficulty of Baker's Game deals and writes the ratings as JSON lines")
+    parser.add_argument( 'files', metavar='file', type=str, nargs='*', help="Deck files to rate.")
+    parser.add_argument( '-n', '--deals', dest='deals', type=int, default=0, help="The number of shuffled deals to rate")
+    parser.add_argument( '--seed', dest='seed', type=int, default=0, help="The seed of the first shuffled deal")
+    parser.add_argument( '-j', '--jobs', dest='jobs', type=int, help="The number of worker processes (default all cores)")
+    parser.add_argument( '--max-nodes', dest='maxNodes', type=int, default=2000, help="The number of positions to search per deal")
+    parser.add_argument( '-c', '--compact', dest='compact', action="store_true", help="Search using the compact board layout")
+    parser.add_argument( '--cells', dest='cells', type=int, choices=range(1, 5), help="The number of cells (default 4)")
+    parser.add_argument( '--cascades', dest='cascades', type=int, choices=range(6, 11), help="The number of cascades (default 8)")
+    parser.add_argument( '--calibrate', dest='calibrate', action="store_true", help="Print the calibration table of the deals instead of rating them")
+    args = parser.parse_args()
+
+    deals = [batch.readDeal( filename ) for filename in args.files]
+    deals.extend( batch.shuffledDeal( seed ) for seed in range( args.seed, args.seed + args.deals ) )
+    options = { 'maxNodes': args.maxNodes, 'layout': 'compact' if args.compact else 'board', 'cells': args.cells, 'cascades': args.cascades, }
+
+    if args.calibrate:
+        table, solved, rated = calibrate( deals, args.jobs, **options )
+        print( f"#   {solved} of {rated} deals solved" )
+        print( "calibration = {" )
+        for metric, ventiles in table.items():
+            print( f"    '{metric}': {ventiles}," )
+        print( "}" )
+
+    else:
+        for result in rateDeals( deals, args.jobs, **options ):
+            print( json.dumps( result ) )
+            sys.stdout.flush()
@@ -15,5 +15,6 @@ setup(
     author_email='hawkfish@electricfish.com',
     url='https://github.com/hawkfish/baker',
     license=license,
-    packages=find_packages(exclude=('tests', 'docs'))
+    packages=find_packages(exclude=('tests', 'docs')),
+    extras_require={'features': ['numpy']}
 )
@@ -0,0 +1,185 @@
+#!/usr/bin/python3
+
+from array import array
+
+class TranspositionTable:
+    """A fixed size table of position keys and small values
+    (such as the depth at which the position was reached)
+    that can stand in for the visited dictionary in Board.solve.
+
+    The table never grows. When two positions want the same slot,
+    the replacement policy decides which one is kept:
+
+        always  - the newest position replaces the old one
+        depth   - the position with the smaller value is kept
+        twotier - buckets of two slots, the first kept by depth
+                  and the second always replaced
+
+    Since positions can be forgotten, the table is lossy
+    and lookups may miss positions that were stored.
+    Keys are stored at their full width (64 or 128 bits),
+    so a hit is only as likely to be a collision as the keys themselves.
+    Lookups with `in` are counted as hits and misses."""
+
+    lossy = True
+
+    policies = ( 'always', 'depth', 'twotier', )
+
+    def __init__(self, entries = None, megabytes = None, policy = 'twotier', keyBits = 64):
+        assert policy in self.policies, f"Unknown replacement policy {policy}"
+        assert keyBits in ( 64, 128, ), f"Unsupported key size {keyBits}"
+
+        #   Bytes per entry: the key and a 16 bit value
+        self.entryBytes = keyBits // 8 + 2
+        if entries is None:
+            assert megabytes is not None, "Table size not specified"
+            entries = int( megabytes * 1024 * 1024 ) // self.entryBytes
+
+        #   Round down to a power of two so we can mask the keys
+        size = 2
+        while size * 2 <= entries: size *= 2
+
+        self._policy = policy
+        self._size = size
+        self._mask = size - 1
+        if policy == 'twotier': self._mask -= 1
+        self._keyBits = keyBits
+
+        self.clear()
+        self.resetStats()
+
+    def clear(self):
+        """Forget all the positions, like dict.clear. The counters
+        keep counting, so they can cover several searches (such as
+        the iterations of Board.solveIterativeDeepening)."""
+
+        #   Keys are split into 64 bit words.
+        #   Values are stored off by one so zero means empty.
+        self._keys = [array('Q', bytes(8 * self._size)) for word in range(self._keyBits // 64)]
+        self._values = array('H', bytes(2 * self._size))
+        self._used = 0
+
+    def resetStats(self):
+        """Reset the counters."""
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.rejections = 0
+
+    def _check(self, key):
+        assert 0 <= key < 1 << self._keyBits, f"Key {key} is wider than {self._keyBits} bits"
+        return key & 0xFFFFFFFFFFFFFFFF, key >> 64
+
+    def _matches(self, slot, low, high):
+        keys = self._keys
+        return self._values[slot] and keys[0][slot] == low and ( len(keys) == 1 or keys[1][slot] == high )
+
+    def __len__(self):
+        return self._used
+
+    def capacity(self):
+        return self._size
+
+    def nbytes(self):
+        """The memory used by the entries."""
+        return self._size * self.entryBytes
+
+    def slot(self, key):
+        """Find the slot holding a key, or None."""
+        low, high = self._check( key )
+        slot = low & self._mask
+        if self._matches( slot, low, high ):
+            return slot
+
+        if self._policy == 'twotier':
+            slot += 1
+            if self._matches( slot, low, high ):
+                return slot
+
+        return None
+
+    def get(self, key, default = None):
+        slot = self.slot( key )
+        if slot is None:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return self._values[slot] - 1
+
+    def __contains__(self, key):
+        return self.get( key ) is not None
+
+    def __getitem__(self, key):
+        value = self.get( key )
+        if value is None: raise KeyError( key )
+        return value
+
+    def __setitem__(self, key, value):
+        assert value >= 0, f"Negative table value {value}"
+        low, high = self._check( key )
+
+        #   Deep values are all equally unimportant
+        value = min( value, 0xFFFE ) + 1
+        values = self._values
+        slot = low & self._mask
+
+        if self._policy == 'twotier':
+            second = slot + 1
+
+            #   Update an existing second tier entry
+            if self._matches( second, low, high ):
+                values[second] = value
+                self.stores += 1
+                return
+
+            #   A worse position goes in the second tier,
+            #   a better one demotes the first tier entry
+            if values[slot] and not self._matches( slot, low, high ):
+                if value > values[slot]:
+                    slot = second
+                else:
+                    self._replace( second, [keys[slot] for keys in self._keys], values[slot] )
+                    self._store( slot, ( low, high, ), value )
+                    self.stores += 1
+                    return
+
+        elif self._policy == 'depth':
+            if values[slot] and not self._matches( slot, low, high ) and value > values[slot]:
+                self.rejections += 1
+                return
+
+        self._replace( slot, ( low, high, ), value )
+        self.stores += 1
+
+    def _store(self, slot, words, value):
+        for keys, word in zip( self._keys, words ):
+            keys[slot] = word
+        self._values[slot] = value
+
+    def _replace(self, slot, words, value):
+        if not self._values[slot]:
+            self._used += 1
+        elif any( keys[slot] != word for keys, word in zip( self._keys, words ) ):
+            self.evictions += 1
+
+        self._store( slot, words, value )
+
+    def stats(self):
+        """The table counters as a dictionary."""
+        return {
+            'entries': self._size,
+            'keyBits': self._keyBits,
+            'used': self._used,
+            'bytes': self.nbytes(),
+            'policy': self._policy,
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'rejections': self.rejections,
+        }
+
+    def __str__(self):
+        return ', '.join( f"{name}: {value}" for name, value in self.stats().items() )
@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import batch
+
+class BatchUnitTest(unittest.TestCase):
+
+    def test_solve_deal(self):
+        result = batch.solveDeal( batch.readDeal( 'fixtures/JS9S8C8S.txt' ) )
+        self.assertEqual( 'fixtures/JS9S8C8S.txt', result['deal'] )
+        self.assertEqual( 'solved', result['status'] )
+        self.assertTrue( result['solvable'] )
+        self.assertEqual( 37, result['length'] )
+        self.assertTrue( result['deck'].startswith( 'JS 9S 8C 8S' ) )
+
+    def test_solve_deal_compact(self):
+        result = batch.solveDeal( batch.readDeal( 'fixtures/JS9S8C8S.txt' ), layout = 'compact' )
+        self.assertEqual( 37, result['length'] )
+
+    def test_solve_deal_variant(self):
+        result = batch.solveDeal( batch.readDeal( 'fixtures/JS9S8C8S.txt' ), cells = 2, cascades = 10 )
+        self.assertEqual( 102, result['length'] )
+
+    def test_unsolvable_deal(self):
+        result = batch.solveDeal( batch.readDeal( 'fixtures/QDQSTS5H.txt' ) )
+        self.assertEqual( 'unsolvable', result['status'] )
+        self.assertFalse( result['solvable'] )
+        self.assertIsNone( result['length'] )
+
+    def test_node_limit(self):
+        result = batch.solveDeal( batch.readDeal( 'fixtures/QDQSTS5H.txt' ), maxNodes = 10 )
+        self.assertEqual( 'nodes', result['status'] )
+        self.assertIsNone( result['solvable'] )
+        self.assertEqual( 10, result['nodes'] )
+
+    def test_shuffled_deal(self):
+        self.assertEqual( batch.shuffledDeal( 5 ), batch.shuffledDeal( 5 ) )
+        self.assertEqual( [*range(52)], sorted( batch.shuffledDeal( 5 )[1] ) )
+
+    def test_run(self):
+        deals = [batch.readDeal( 'fixtures/JS9S8C8S.txt' ), batch.readDeal( 'fixtures/8H4S3H9C.txt' ), batch.shuffledDeal( 1 )]
+        output = io.StringIO()
+        solved = batch.run( deals, output, jobs = 2, maxNodes = 20000 )
+
+        results = [json.loads( line ) for line in output.getvalue().splitlines()]
+        self.assertEqual( [deal[0] for deal in deals], [result['deal'] for result in results] )
+        self.assertEqual( [37, 84, None], [result['length'] for result in results] )
+        self.assertEqual( 2, solved )
+
+    def test_shared_positions(self):
+        deal = batch.readDeal( 'fixtures/JS9S8C8S.txt' )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join( directory, 'positions.db' )
+            output = io.StringIO()
+            batch.run( [deal, deal], output, jobs = 1, positionsPath = path )
+
+        first, second = [json.loads( line ) for line in output.getvalue().splitlines()]
+        self.assertEqual( first['length'], second['length'] )
+        self.assertLess( second['nodes'], first['nodes'] )
+
+if __name__ == '__main__':
+    unittest.main()
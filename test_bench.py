@@ -0,0 +1,38 @@
+#!/usr/bin/python3
+
+import unittest
+
+import bench
+import compact
+
+class BenchUnitTest(unittest.TestCase):
+
+    def test_deals(self):
+        deals = bench.benchmarkDeals( deals = 2, seed = 5 )
+        names = [name for name, deck in deals]
+        self.assertIn( 'fixtures/JS9S8C8S.txt', names )
+        self.assertEqual( ['unshuffled', 'reversed', 'seed5', 'seed6'], names[-4:] )
+        for name, deck in deals:
+            self.assertEqual( [*range(52)], sorted( deck ), name )
+
+    def test_benchmark(self):
+        deal = ( 'reversed', [*range(51,-1,-1)], )
+        result = bench.benchmark( deal, compact.CompactBoard, repeat = 2 )
+        self.assertEqual( 'reversed', result['deal'] )
+        self.assertEqual( 1, result['length'] )
+        self.assertEqual( 0, result['nodes'] )
+        self.assertLess( 0, result['peakBytes'] )
+
+        result = bench.benchmark( deal, memory = False )
+        self.assertNotIn( 'peakBytes', result )
+
+    def test_compare(self):
+        baseline = [{ 'deal': 'a', 'length': 10, 'nodes': 100, 'seconds': 1.0, 'peakBytes': 1000, }]
+        self.assertEqual( [], bench.compare( baseline, baseline ) )
+
+        results = [{ 'deal': 'a', 'length': 12, 'nodes': 105, 'seconds': 1.5, }, { 'deal': 'b', 'length': 1, 'nodes': 1, 'seconds': 1.0, }]
+        self.assertEqual( ['a: length 10 => 12', 'a: seconds 1 => 1.5'], bench.compare( results, baseline ) )
+        self.assertEqual( ['a: length 10 => 12'], bench.compare( results, baseline, 0.6 ) )
+
+if __name__ == '__main__':
+    unittest.main()
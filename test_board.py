@@ -1,8 +1,11 @@
 #!/usr/bin/python3
 
+import random
+import threading
 import unittest
 
 import board
+import table
 
 #   Deck fixtures
 unshuffled = [*range(0,52)]
@@ -39,6 +42,18 @@ AS 5S 8C QH JS 6D KH 7H
 AC 3D 9C 3C
 """)
 
+def endgame(seed, low):
+    """A board with the cards above low shuffled into the cascades."""
+    setup = board.Board(unshuffled)
+    for cascade in setup._tableau: cascade.clear()
+    cards = [board.makeCard(suit, pips) for suit in range(4) for pips in range(low + 1, 13)]
+    random.Random(seed).shuffle(cards)
+    for c, card in enumerate(cards): setup._tableau[c % len(setup._tableau)].append(card)
+    setup._foundations = [low, low, low, low, ]
+    setup._key = setup.computeKey()
+    setup.reindex()
+    return setup
+
 class CardUnitTest(unittest.TestCase):
 
     def test_makeCard(self):
@@ -71,6 +86,43 @@ class CardUnitTest(unittest.TestCase):
         self.assert_formatCard('QC', 0, 11)
         self.assert_formatCard('KC', 0, 12)
 
+class EncodingUnitTest(unittest.TestCase):
+
+    def test_encode_move(self):
+        for start in range(-4, 12):
+            for finish in range(-4, 12):
+                code = board.encodeMove((start, finish,))
+                self.assertLess(code, 256)
+                self.assertEqual((start, finish,), board.decodeMove(code))
+
+        self.assertEqual(0x4C, board.encodeMove((0, 8,)))
+        self.assertEqual(0x33, board.encodeMove((-1, -1,)))
+        self.assertRaises(AssertionError, board.encodeMove, (12, 0,))
+
+    def test_encode_solution(self):
+        self.assertEqual(b'', board.encodeSolution([]))
+        self.assertEqual(bytes([0xFF, 0x4C, 0x43, 0xFF]), board.encodeSolution([[], [(0, 8,), (0, -1,)]]))
+
+        for setup in (reversed, two_aces_two,):
+            solution = board.Board(setup).solve()
+            encoded = board.encodeSolution(solution)
+            self.assertEqual(sum(len(turn) + 1 for turn in solution), len(encoded))
+            self.assertEqual(solution, board.decodeSolution(encoded))
+
+        self.assertRaises(AssertionError, board.decodeSolution, bytes([0xFF, 0x4C]))
+
+        #   Locations past 11 need a byte each
+        wide = [[], [(0, 13,), (13, -1,)]]
+        self.assertEqual(bytes([0xFE, 0xFF, 0x04, 0x11, 0x11, 0x03, 0xFF]), board.encodeSolution(wide))
+        self.assertEqual(wide, board.decodeSolution(board.encodeSolution(wide)))
+
+        #   The first move can't be encoded as the wide marker
+        first = [[(11, 10,)], []]
+        self.assertEqual(bytes([0xFE, 0x0F, 0x0E, 0xFF, 0xFF]), board.encodeSolution(first))
+        self.assertEqual(first, board.decodeSolution(board.encodeSolution(first)))
+        later = [[], [(11, 10,)]]
+        self.assertEqual(later, board.decodeSolution(board.encodeSolution(later)))
+
 class BoardUnitTest(unittest.TestCase):
 
     def assert_init(self, deck):
@@ -105,6 +157,16 @@ class BoardUnitTest(unittest.TestCase):
     def test_init(self):
         self.assert_init(unshuffled)
 
+    def test_init_variants(self):
+        for cells, cascades in ((1, 6,), (2, 8,), (3, 10,),):
+            b = board.Board(unshuffled, cells = cells, cascades = cascades)
+            self.assertEqual(cells, len(b._cells))
+            self.assertEqual(cascades, len(b._tableau))
+            self.assertEqual(unshuffled[:cascades], [cascade[0] for cascade in b._tableau])
+            self.assertEqual(52 - 52 // cascades * cascades, sum(len(cascade) > 52 // cascades for cascade in b._tableau))
+            self.assertTrue(b.isCellIndex(cascades))
+            self.assertFalse(b.isCellIndex(cascades - 1))
+
     def assert_str(self, expected, deck):
         self.assertEqual(expected, str(board.Board(deck)))
 
@@ -207,10 +269,84 @@ Cells:
         clubs = 0
         setup._cells = [ board.noCard, board.makeCard(clubs, king), board.noCard, board.noCard, ]
         setup._foundations = [queen, king, king, king, ]
+        setup.reindex()
         expected = [(9, -1,),]
         actual = setup.moveToFoundations()
         self.assertEqual(expected, actual)
 
+    def test_safe_rules(self):
+        def setup(rules, cell, cascades):
+            b = board.Board(unshuffled, rules = rules)
+            b._tableau = [list(cascade) for cascade in cascades] + [[] for c in range(8 - len(cascades))]
+            b._cells = [cell, board.noCard, board.noCard, board.noCard, ]
+            b._foundations = [board.noCard, 12, 12, 12, ]
+            b.reindex()
+            return b
+
+        #   A queen in a cell goes onto its king
+        clubs = [*range(11)]
+        self.assertEqual([], setup((), 11, [[12], clubs]).moveToFoundations())
+        self.assertEqual([(8, 0,)], setup(('cells',), 11, [[12], clubs]).moveToFoundations())
+        self.assertEqual([], setup(('kings',), 11, [[12], clubs]).moveToFoundations())
+
+        #   Unless the turn just put it there
+        self.assertEqual([], setup(('cells',), 11, [[12], clubs]).moveToFoundations(False, (2, 8,)))
+
+        #   A king in a cell goes to the first empty cascade
+        clubs = [*range(12)]
+        self.assertEqual([(8, 1,)], setup(('kings',), 12, [clubs]).moveToFoundations())
+        self.assertEqual([], setup(('cells',), 12, [clubs]).moveToFoundations())
+
+        self.assertRaises(AssertionError, board.Board, unshuffled, rules = ('sideways',))
+
+    def test_solve_safe_rules(self):
+        for rules in (('cells',), ('kings',), ('cells', 'kings',),):
+            solution = board.Board(two_aces_two, rules = rules).solve()
+            b = board.Board(two_aces_two)
+            for turn in solution:
+                for move in turn:
+                    b.moveCard(move, True)
+            self.assertTrue(b.solved(), rules)
+
+    def test_supermoves(self):
+        def setup(cells, cascades):
+            b = board.Board(unshuffled, supermoves = True)
+            b._tableau = [list(cascade) for cascade in cascades] + [[] for c in range(8 - len(cascades))]
+            b._cells = cells + (4 - len(cells)) * [board.noCard]
+            b._foundations = [board.noCard, board.noCard, 12, 12, ]
+            b._key = b.computeKey()
+            b.reindex()
+            return b
+
+        #   Clubs 5 4 3 2 on the diamonds ace, which can go onto
+        #   the clubs 6 or an empty cascade
+        run = [13, 4, 3, 2, 1]
+        b = setup([0, 14], [run, [5], [*range(15, 26)], [*range(6, 13)]])
+        self.assertEqual([(0, 1, 4,), (0, 4, 4,)], b.enumerateSupermoves())
+
+        #   Moving through the cells and the empty cascades
+        moves = b.moveStack((0, 1, 4,), True)
+        self.assertEqual([13], b._tableau[0])
+        self.assertEqual([5, 4, 3, 2, 1], b._tableau[1])
+        self.assertEqual([0, 14, board.noCard, board.noCard], b._cells)
+        b.backtrack(moves)
+        self.assertEqual(run, b._tableau[0])
+
+        #   Not enough room with full cells and one empty cascade
+        b = setup([0, 14, 15, 16], [run, [5], [17, 18, 19], [20, 21, 22], [23, 24, 25], [6, 7, 8], [9, 10, 11, 12]])
+        self.assertEqual([], b.enumerateSupermoves())
+
+        #   Supermoves are tried first and are single card moves in the solution
+        b = board.Board(two_aces_two, supermoves = True)
+        self.assertEqual(b.enumerateMoves()[-1], next(b.iterateMoves()))
+        solution = b.solve()
+        self.assertLess(len(solution), 72)
+        b = board.Board(two_aces_two)
+        for turn in solution:
+            for move in turn:
+                b.moveCard(move, True)
+        self.assertTrue(b.solved())
+
     def test_move_between_cascades_and_cells(self):
         b = board.Board(unshuffled)
 
@@ -328,6 +464,7 @@ Cells:
 
         #   Clear the cascades
         for cascade in b._tableau: cascade.clear()
+        b.reindex()
 
         #   Move a king to an empty cell
         b.moveCard((-1, 0,))
@@ -361,6 +498,7 @@ Cells:
         for start, cascade in enumerate(setup._tableau):
             cascade.clear()
             if start: cascade.append(start)
+        setup.reindex()
 
         #   Every card can move to the leftmost or the next cascade
         for start, cascade in enumerate(setup._tableau):
@@ -446,6 +584,7 @@ Cells:
             setup._tableau[ t ] = board.parseDeck( s )
         setup._cells = board.parseDeck( "KC TS JC --" )
         setup._firstFree = 3
+        setup.reindex()
 
         #   Validate stacking
         stacked = (0, 1, 3, 5, 6, )
@@ -507,16 +646,40 @@ Cells:
             setup._tableau[ t ] = board.parseDeck( s )
         setup._cells = board.parseDeck( "4S -- 5S 3D" )
         setup._firstFree = 1
+        setup.reindex()
 
         expected = [(3, 9), (7, 9), (0, 9), (2, 9), (5, 9), (6, 9), (10, 7), (11, 1), (0, 6), ]
 
         actual = setup.enumerateMoves()
         self.assertEqual(expected, actual)
 
+    def test_iterate_moves(self):
+        #   Walk through the positions of some deals
+        for setup in (unshuffled, no_aces, two_aces, two_aces_two,):
+            b = board.Board(setup)
+            b.moveToFoundations()
+            walk = random.Random(len(setup))
+            for step in range(200):
+                expected = b.enumerateMoves()
+                expected.reverse()
+
+                #   The board can change between moves
+                actual = []
+                for move in b.iterateMoves():
+                    actual.append(move)
+                    turn = [b.moveCard(move, True)]
+                    turn.extend(b.moveToFoundations(True))
+                    b.backtrack(turn)
+                self.assertEqual(expected, actual)
+
+                if not expected: break
+                b.moveCard(walk.choice(expected), True)
+                b.moveToFoundations(True)
+
     def test_memento_values(self):
         visited = set()
         for deck in (unshuffled, reversed, no_aces, two_aces, two_aces_two,):
-            setup = board.Board(deck)
+            setup = board.Board(deck, exact = True)
             self.assertTrue(setup._resort)
             self.assertTrue(setup._rehash)
 
@@ -529,9 +692,79 @@ Cells:
             visited.add(memento)
 
             #   Check that a new copy gets the same hash
-            setup = board.Board(deck)
+            setup = board.Board(deck, exact = True)
             self.assertEqual(memento, setup.memento())
 
+    def test_memento_keys(self):
+        visited = set()
+        for deck in (unshuffled, reversed, no_aces, two_aces, two_aces_two,):
+            setup = board.Board(deck)
+            memento = setup.memento()
+            self.assertEqual(setup.computeKey(), memento)
+            self.assertLess(memento, 1 << 64)
+
+            self.assertFalse( memento in visited, f"Duplicate memento #{len(visited)}: {memento}" )
+            visited.add(memento)
+
+            #   Check that a new copy gets the same key
+            self.assertEqual(memento, board.Board(deck).memento())
+            self.assertLess(board.Board(deck, keyBits = 128).memento(), 1 << 128)
+
+    def test_memento_incremental(self):
+        setup = board.Board(two_aces_two)
+        start = setup.memento()
+        history = [setup.moveToFoundations()]
+        for level in range(30):
+            moves = setup.enumerateMoves()
+            if not moves: break
+            moves = [setup.moveCard(moves[level % len(moves)])]
+            moves.extend(setup.moveToFoundations())
+            history.append(moves)
+            self.assertEqual(setup.computeKey(), setup.memento())
+
+        while history: setup.backtrack(history.pop())
+        self.assertEqual(start, setup.memento())
+
+    def test_memento_cascade_order(self):
+        #   Swapping cascades gives the same position
+        setup = board.Board(no_aces)
+        swapped = board.Board(no_aces)
+        swapped._tableau[0], swapped._tableau[5] = swapped._tableau[5], swapped._tableau[0]
+        self.assertEqual(setup.memento(), swapped.computeKey())
+
+        #   But moving cards between cascades does not
+        swapped._tableau[0][-1], swapped._tableau[5][-1] = swapped._tableau[5][-1], swapped._tableau[0][-1]
+        self.assertNotEqual(setup.memento(), swapped.computeKey())
+
+    def test_memento_symmetric(self):
+        #   Relabelling the suits gives the same position
+        swap = (1, 0, 3, 2,)
+        relabelled = [board.makeCard(swap[board.suit(card)], board.pips(card)) for card in two_aces_two]
+        setup = board.Board(two_aces_two, symmetric = True)
+        self.assertEqual(setup.memento(), board.Board(relabelled, symmetric = True).memento())
+        self.assertNotEqual(board.Board(two_aces_two).memento(), board.Board(relabelled).memento())
+        self.assertLess(setup.memento(), 1 << 64)
+        self.assertLess(board.Board(two_aces_two, keyBits = 128, symmetric = True).memento(), 1 << 128)
+
+        #   The packed keys are updated incrementally
+        history = [setup.moveToFoundations()]
+        for level in range(20):
+            moves = setup.enumerateMoves()
+            if not moves: break
+            moves = [setup.moveCard(moves[level % len(moves)], True)]
+            moves.extend(setup.moveToFoundations())
+            history.append(moves)
+        self.assertEqual(setup.computeKey(), setup._key)
+
+        self.assertEqual(72, len(board.Board(two_aces_two, symmetric = True).solve()))
+        self.assertRaises(AssertionError, board.Board, two_aces_two, exact = True, symmetric = True)
+
+    def test_memento_exact(self):
+        setup = board.Board(two_aces, exact = True)
+        setup.moveToFoundations()
+        expected = tuple(sorted(tuple(cascade) for cascade in setup._tableau))
+        self.assertEqual(expected, setup.memento())
+
     def test_not_solved(self):
         setup = board.Board(unshuffled)
         self.assertFalse( setup.solved() )
@@ -577,6 +810,7 @@ Cells:
         solution = b.solve()
         actual = len(solution)
         self.assertEqual(expected, actual)
+        self.assertEqual(solution, board.Board(setup, exact = True).solve())
         if display:
             forward = []
             while solution:
@@ -606,5 +840,204 @@ Cells:
     def test_solve_two_aces_two(self):
         self.assert_solve(two_aces_two, 72)
 
+    def test_lower_bound(self):
+        setup = board.Board(reversed)
+        setup.moveToFoundations()
+        self.assertEqual(0, setup.lowerBound())
+
+        #   Unshuffled cascades bury low cards under higher ones
+        setup = board.Board(unshuffled)
+        self.assertEqual(20, setup.lowerBound())
+
+        setup = board.Board(unshuffled)
+        for cascade in setup._tableau: cascade.clear()
+        setup._tableau[0].extend(board.parseDeck("KC AD QC 2D"))
+        setup._foundations = [10, -1, 12, 12]
+        self.assertEqual(1, setup.lowerBound())
+
+    def assert_solve_best_first(self, setup, weight):
+        b = board.Board(setup)
+        visited = {}
+        solution = b.solve(visited = visited, strategy = 'astar', weight = weight)
+        self.assertTrue(solution)
+
+        #   The board is back where it started, after the first turn
+        start = board.Board(setup)
+        start.moveToFoundations()
+        self.assertEqual(str(start), str(b))
+        b.backtrack(solution[0].copy())
+
+        #   Replay the solution
+        for moves in solution:
+            for move in moves: b.moveCard(move, True)
+        self.assertTrue(b.solved())
+
+        return solution
+
+    def test_solve_best_first(self):
+        for setup, longest in ((no_aces, 555), (two_aces_two, 72),):
+            for weight in (2, 3,):
+                solution = self.assert_solve_best_first(setup, weight)
+                self.assertLess(len(solution), longest)
+
+    def test_solve_best_first_reversed(self):
+        self.assertEqual(1, len(board.Board(reversed).solve(strategy = 'astar')))
+
+    def test_solve_iterative_deepening(self):
+        self.assertEqual(1, len(board.Board(reversed).solve(strategy = 'ida')))
+
+        #   Both IDA* and A* find shortest solutions
+        for seed, low, expected in ((0, 6, 6), (0, 4, 9), (2, 5, 8), (3, 4, 10),):
+            shortest = endgame(seed, low).solve(strategy = 'astar', weight = 1)
+            self.assertEqual(expected, len(shortest))
+
+            b = endgame(seed, low)
+            solution = b.solve(strategy = 'ida')
+            self.assertEqual(expected, len(solution), (seed, low))
+            self.assertGreaterEqual(len(endgame(seed, low).solve()), expected)
+
+            for moves in solution[1:]:
+                for move in moves: b.moveCard(move, True)
+            self.assertTrue(b.solved())
+
+    def test_solve_iterative_deepening_table(self):
+        visited = table.TranspositionTable(entries = 1024)
+        self.assertEqual(9, len(endgame(0, 4).solve(visited = visited, strategy = 'ida')))
+        #   The counters cover the iterations before the table was last cleared
+        self.assertLess(len(visited), visited.stores)
+
+    def test_solve_best_first_improve(self):
+        #   The callback keeps searching for shorter solutions
+        b = board.Board(two_aces_two)
+        first = len(b.solve(strategy = 'astar', weight = 3))
+        calls = 0
+        def callback(**kwargs):
+            nonlocal calls
+            calls += 1
+            return calls < 2000
+        best = len(b.solve(callback, strategy = 'astar', weight = 3))
+        self.assertLessEqual(best, first)
+
+    def test_solve_max_nodes(self):
+        for strategy in ('dfs', 'astar', 'ida',):
+            b = board.Board(no_aces)
+            self.assertEqual([], b.solve(strategy = strategy, maxNodes = 10), strategy)
+            self.assertEqual(10, b.searchStats()['nodes'], strategy)
+            self.assertEqual('nodes', b.searchStats()['stopped'], strategy)
+
+        b = board.Board(reversed)
+        b.solve(maxNodes = 10)
+        self.assertEqual(0, b.searchStats()['nodes'])
+        self.assertIsNone(b.searchStats()['stopped'])
+
+    def test_solve_max_seconds(self):
+        for strategy in ('dfs', 'astar', 'ida',):
+            b = board.Board(no_aces)
+            self.assertEqual([], b.solve(strategy = strategy, maxSeconds = 0))
+            self.assertEqual('seconds', b.searchStats()['stopped'])
+
+    def test_solve_cancel(self):
+        cancel = threading.Event()
+        cancel.set()
+        for strategy in ('dfs', 'astar', 'ida',):
+            b = board.Board(no_aces)
+            self.assertEqual([], b.solve(strategy = strategy, cancel = cancel))
+            self.assertEqual('cancelled', b.searchStats()['stopped'])
+
+    def test_solve_callback_every(self):
+        b = board.Board(two_aces_two)
+        solution = b.solve()
+        nodes = b.searchStats()['nodes']
+
+        calls = []
+        def callback(**kwargs):
+            calls.append(len(kwargs['solution']))
+            return not kwargs['solution']
+        b = board.Board(two_aces_two)
+        self.assertEqual(solution, b.solve(callback, callbackEvery = 16))
+        #   The solution is seen at the next sample
+        self.assertGreaterEqual(len(calls), nodes // 16)
+        self.assertLessEqual(len(calls), nodes // 16 + 2)
+
+        #   Only called for solutions, and once at the end
+        calls.clear()
+        b = board.Board(two_aces_two)
+        self.assertEqual(solution, b.solve(callback, callbackEvery = 0))
+        self.assertEqual([72, 72], calls)
+        self.assertEqual('callback', b.searchStats()['stopped'])
+
+    def test_search_stats(self):
+        for strategy in ('dfs', 'astar', 'ida',):
+            b = endgame(0, 4)
+            solution = b.solve(strategy = strategy, timers = 4)
+            stats = b.searchStats()
+            self.assertLess(0, stats['nodes'], strategy)
+            self.assertLess(0, stats['expansions'], strategy)
+            self.assertLess(1, stats['branching'], strategy)
+            self.assertLessEqual(len(solution) - 1, stats['maxDepth'], strategy)
+            self.assertEqual(0, stats['resorts'], strategy)
+            self.assertIsNone(stats['stopped'], strategy)
+            self.assertLessEqual(0, stats['enumerateMovesSeconds'], strategy)
+            self.assertLessEqual(0, stats['moveToFoundationsSeconds'], strategy)
+
+        #   Exact mementos count their rebuilds
+        b = board.Board(two_aces_two, exact = True)
+        b.solve()
+        stats = b.searchStats()
+        self.assertLess(0, stats['resorts'])
+        self.assertLessEqual(stats['resorts'], stats['rehashes'])
+        self.assertNotIn('enumerateMovesSeconds', stats)
+
+    def test_solve_reopen(self):
+        with open('fixtures/JS9S8C8S.txt') as deckFile:
+            deck = board.parseDeck(deckFile.read())
+
+        lengths = []
+        for reopen in (False, True,):
+            b = board.Board(deck)
+            solution = b.solve(lambda **kwargs: True, callbackEvery = 0, maxNodes = 20000, reopen = reopen)
+            lengths.append(len(solution))
+            self.assertEqual(reopen, 0 < b.searchStats()['reopened'])
+        self.assertLess(lengths[1], lengths[0])
+
+    def test_solve_dead(self):
+        with open('fixtures/QDQSTS5H.txt') as deckFile:
+            deck = board.parseDeck(deckFile.read())
+        b = board.Board(deck)
+        self.assertEqual([], b.solve())
+        self.assertLess(0, b.searchStats()['dead'])
+
+        #   Dead positions are never solvable
+        b = board.Board(two_aces_two)
+        solution = b.solve(lambda **kwargs: True, callbackEvery = 0, reopen = True, maxNodes = 20000)
+        self.assertTrue(solution)
+        self.assertLess(0, b.searchStats()['dead'])
+
+    def test_solve_variants(self):
+        with open('fixtures/JS9S8C8S.txt') as deckFile:
+            deck = board.parseDeck(deckFile.read())
+
+        #   Fewer cells make the deal harder, more cascades make it easier
+        expected = { (4, 8,): 37, (3, 8,): 0, (4, 7,): 37, (2, 10,): 102, }
+        for (cells, cascades), length in expected.items():
+            b = board.Board(deck, cells = cells, cascades = cascades)
+            solution = b.solve()
+            self.assertEqual(length, len(solution), (cells, cascades,))
+
+            b = board.Board(deck, cells = cells, cascades = cascades)
+            for turn in board.decodeSolution(board.encodeSolution(solution)):
+                for move in turn:
+                    b.moveCard(move, True)
+            self.assertEqual(bool(length), b.solved())
+
+    def test_solve_lazy(self):
+        for setup in (unshuffled, reversed, no_aces, two_aces_two,):
+            eager = board.Board(setup)
+            expected = eager.solve(lazy = False)
+            lazy = board.Board(setup)
+            self.assertEqual(expected, lazy.solve(lazy = True))
+            self.assertEqual(eager.searchStats()['nodes'], lazy.searchStats()['nodes'])
+            self.assertEqual(str(eager), str(lazy))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,106 @@
+#!/usr/bin/python3
+
+import os
+import tempfile
+import unittest
+
+import batch
+import board
+import cache
+
+class CacheUnitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.deck = batch.readDeal( 'fixtures/JS9S8C8S.txt' )[1]
+        self.solution = board.Board( self.deck ).solve()
+
+    def relabelled(self):
+        """The deck with hearts and spades swapped."""
+        swap = [0, 1, 3, 2]
+        return [board.makeCard( swap[board.suit( card )], board.pips( card ) ) for card in self.deck]
+
+    def play(self, deck, solution):
+        b = board.Board( deck )
+        for turn in solution:
+            for move in turn:
+                b.moveCard( move, True )
+        return b.solved()
+
+    def test_canonical_key(self):
+        self.assertEqual( cache.canonicalKey( self.deck ), cache.canonicalKey( self.relabelled() ) )
+        self.assertNotEqual( cache.canonicalKey( self.deck ), cache.canonicalKey( [*range(52)] ) )
+        self.assertEqual( [*range(52)], sorted( cache.canonicalDeck( self.deck ) ) )
+
+    def test_miss(self):
+        solutions = cache.SolutionCache()
+        self.assertIsNone( solutions.get( self.deck ) )
+        self.assertEqual( 0, len(solutions) )
+
+    def test_put_get(self):
+        solutions = cache.SolutionCache()
+        solutions.put( self.deck, self.solution, nodes = 100, seconds = 0.5, strategy = 'dfs' )
+        entry = solutions.get( self.deck )
+        self.assertEqual( self.solution, entry['solution'] )
+        self.assertEqual( len(self.solution), entry['length'] )
+        self.assertFalse( entry['optimal'] )
+        self.assertFalse( entry['unsolvable'] )
+        self.assertEqual( 100, entry['nodes'] )
+        self.assertEqual( 'dfs', entry['strategy'] )
+
+    def test_relabelled_deal(self):
+        solutions = cache.SolutionCache()
+        solutions.put( self.deck, self.solution )
+        relabelled = self.relabelled()
+        entry = solutions.get( relabelled )
+        self.assertEqual( len(self.solution), entry['length'] )
+        self.assertNotEqual( self.solution, entry['solution'] )
+        self.assertTrue( self.play( relabelled, entry['solution'] ) )
+
+    def test_keep_shorter(self):
+        solutions = cache.SolutionCache()
+        solutions.put( self.deck, self.solution, nodes = 100 )
+        solutions.put( self.deck, self.solution + [[]], nodes = 50 )
+        entry = solutions.get( self.deck )
+        self.assertEqual( len(self.solution), entry['length'] )
+        self.assertEqual( 150, entry['nodes'] )
+
+        shorter = self.solution[:-1]
+        solutions.put( self.deck, shorter, optimal = True, nodes = 10, strategy = 'ida' )
+        entry = solutions.get( self.deck )
+        self.assertEqual( len(shorter), entry['length'] )
+        self.assertTrue( entry['optimal'] )
+        self.assertEqual( 'ida', entry['strategy'] )
+        self.assertEqual( 160, entry['nodes'] )
+        self.assertEqual( 1, len(solutions) )
+
+    def test_unsolvable(self):
+        solutions = cache.SolutionCache()
+        deck = batch.readDeal( 'fixtures/QDQSTS5H.txt' )[1]
+        solutions.put( deck, [], unsolvable = True, nodes = 1000 )
+        entry = solutions.get( deck )
+        self.assertTrue( entry['unsolvable'] )
+        self.assertIsNone( entry['solution'] )
+
+    def test_solved_after_unsolvable(self):
+        solutions = cache.SolutionCache()
+        solutions.put( self.deck, [], unsolvable = True, nodes = 1000 )
+        solutions.put( self.deck, self.solution, nodes = 100 )
+        entry = solutions.get( self.deck )
+        self.assertFalse( entry['unsolvable'] )
+        self.assertEqual( self.solution, entry['solution'] )
+        self.assertEqual( 1100, entry['nodes'] )
+
+        #   Without a solution, the mark stays
+        solutions.put( self.deck, [], nodes = 10 )
+        self.assertFalse( solutions.get( self.deck )['unsolvable'] )
+
+    def test_persistent(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join( directory, 'solutions.db' )
+            with cache.SolutionCache( path ) as solutions:
+                solutions.put( self.deck, self.solution )
+            with cache.SolutionCache( path ) as solutions:
+                self.assertEqual( self.solution, solutions.get( self.deck )['solution'] )
+
+if __name__ == '__main__':
+    unittest.main()
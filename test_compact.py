@@ -0,0 +1,164 @@
+#!/usr/bin/python3
+
+import unittest
+
+import board
+import compact
+
+from test_board import unshuffled, reversed, no_aces, two_aces, two_aces_two
+
+class CompactBoardUnitTest(unittest.TestCase):
+
+    decks = (unshuffled, reversed, no_aces, two_aces, two_aces_two,)
+
+    def test_init(self):
+        for deck in self.decks:
+            expected = board.Board(deck)
+            actual = compact.CompactBoard(deck)
+            self.assertEqual(expected.cascades(), actual.cascades())
+            self.assertEqual(str(expected), str(actual))
+
+    def test_slots(self):
+        b = compact.CompactBoard(unshuffled)
+        self.assertFalse(hasattr(b, '__dict__'))
+
+    def test_move_to_foundations(self):
+        for deck in self.decks:
+            expected = board.Board(deck)
+            actual = compact.CompactBoard(deck)
+            self.assertEqual(expected.moveToFoundations(), actual.moveToFoundations())
+            self.assertEqual(str(expected), str(actual))
+
+    def test_move_between_cascades_and_cells(self):
+        expected = board.Board(unshuffled)
+        actual = compact.CompactBoard(unshuffled)
+        for move in ((0,8,), (0,9,), (1,10,), (2,11,), (11,3,), (10,3,), (8,3,), (9,1,),):
+            expected.moveCard(move)
+            actual.moveCard(move, True)
+            self.assertEqual(expected._firstFree, actual._firstFree, move)
+            self.assertEqual(str(expected), str(actual), move)
+
+    def test_enumerate_moves(self):
+        for deck in self.decks:
+            expected = board.Board(deck)
+            actual = compact.CompactBoard(deck)
+            expected.moveToFoundations()
+            actual.moveToFoundations()
+
+            #   Walk a few levels down the first moves
+            for level in range(20):
+                moves = expected.enumerateMoves()
+                self.assertEqual(moves, actual.enumerateMoves())
+                self.assertEqual(list(expected.iterateMoves()), list(actual.iterateMoves()))
+                if not moves: break
+                move = moves[level % len(moves)]
+                expected.moveCard(move)
+                actual.moveCard(move, True)
+                self.assertEqual(expected.moveToFoundations(), actual.moveToFoundations())
+
+    def test_move_index(self):
+        for deck in self.decks:
+            expected = board.Board(deck)
+            actual = compact.CompactBoard(deck)
+            actual.reindex()
+            expected.moveToFoundations()
+            actual.moveToFoundations()
+
+            for level in range(40):
+                self.assertEqual(expected.emptyCascades(), actual.emptyCascades())
+                for cascade in expected.cascades():
+                    self.assertEqual(expected.movableStack(cascade), actual.movableStack(cascade))
+                moves = expected.enumerateMoves()
+                if not moves: break
+                move = moves[level % len(moves)]
+                expected.moveCard(move)
+                actual.moveCard(move, True)
+                expected.moveToFoundations()
+                actual.moveToFoundations()
+
+    def test_backtrack(self):
+        for deck in (no_aces, two_aces, two_aces_two,):
+            setup = compact.CompactBoard(deck)
+            setup.moveToFoundations()
+            for move in setup.enumerateMoves():
+                expected = str(setup)
+                memento = setup.memento()
+                setup.moveCard(move, True)
+                self.assertNotEqual(memento, setup.memento(), move)
+                setup.backtrack( [move,] )
+                self.assertEqual(expected, str(setup), move)
+                self.assertEqual(memento, setup.memento(), move)
+
+    def test_memento_values(self):
+        visited = set()
+        for deck in self.decks:
+            memento = compact.CompactBoard(deck).memento()
+            self.assertFalse( memento in visited )
+            visited.add(memento)
+            self.assertEqual(memento, compact.CompactBoard(deck).memento())
+
+    def test_memento_keys(self):
+        for deck in self.decks:
+            expected = board.Board(deck)
+            actual = compact.CompactBoard(deck)
+            self.assertEqual(expected.memento(), actual.memento())
+            self.assertEqual(expected.moveToFoundations(), actual.moveToFoundations())
+            self.assertEqual(expected.memento(), actual.memento())
+            self.assertEqual(actual.computeKey(), actual.memento())
+
+    def test_memento_symmetric(self):
+        for deck in self.decks:
+            expected = board.Board(deck, symmetric = True)
+            actual = compact.CompactBoard(deck, symmetric = True)
+            self.assertEqual(expected.memento(), actual.memento())
+            self.assertEqual(expected.moveToFoundations(), actual.moveToFoundations())
+            self.assertEqual(expected.memento(), actual.memento())
+
+    def test_safe_rules(self):
+        for deck in self.decks:
+            rules = board.Board.safeRules
+            self.assertEqual(board.Board(deck, rules = rules).solve(), compact.CompactBoard(deck, rules = rules).solve())
+
+    def test_supermoves(self):
+        for deck in self.decks:
+            self.assertEqual(board.Board(deck, supermoves = True).solve(), compact.CompactBoard(deck, supermoves = True).solve())
+
+    def test_variants(self):
+        for cells, cascades in ((1, 6,), (3, 7,), (2, 10,),):
+            for deck in self.decks:
+                expected = board.Board(deck, cells = cells, cascades = cascades)
+                actual = compact.CompactBoard(deck, cells = cells, cascades = cascades)
+                self.assertEqual(str(expected), str(actual))
+                self.assertEqual(expected.solve(maxNodes = 5000), actual.solve(maxNodes = 5000))
+                self.assertEqual(expected.searchStats()['nodes'], actual.searchStats()['nodes'])
+
+    def test_memento_exact(self):
+        setup = compact.CompactBoard(two_aces, exact = True)
+        setup.moveToFoundations()
+        expected = tuple(sorted(bytes(cascade) for cascade in setup.cascades()))
+        self.assertEqual(expected, setup.memento())
+
+    def assert_solve(self, deck, expected):
+        b = compact.CompactBoard(deck)
+        solution = b.solve()
+        self.assertEqual(expected, len(solution))
+        self.assertEqual(board.Board(deck).solve(), solution)
+        self.assertEqual(solution, compact.CompactBoard(deck, exact = True).solve())
+
+    def test_solve_unshuffled(self):
+        self.assert_solve(unshuffled, 958)
+
+    def test_solve_reversed(self):
+        self.assert_solve(reversed, 1)
+
+    def test_solve_no_aces(self):
+        self.assert_solve(no_aces, 555)
+
+    def test_solve_two_aces(self):
+        self.assert_solve(two_aces, 86)
+
+    def test_solve_two_aces_two(self):
+        self.assert_solve(two_aces_two, 72)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+
+import unittest
+
+import batch
+import board
+import filters
+
+try:
+    import features
+except ImportError:
+    features = None
+
+@unittest.skipIf( features is None, "NumPy is not installed" )
+class FeaturesUnitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.seeds = [*range(20)]
+        self.decks = [batch.shuffledDeal( seed )[1] for seed in self.seeds]
+        self.packed = features.shuffledDecks( self.seeds )
+
+    def test_pack(self):
+        self.assertEqual( ( 20, 52, ), self.packed.shape )
+        self.assertEqual( self.decks, self.packed.tolist() )
+        self.assertEqual( self.decks[:2], features.packDecks( self.decks[:2] ).tolist() )
+
+        decks = features.randomDecks( 10, seed = 3 )
+        self.assertEqual( ( 10, 52, ), decks.shape )
+        self.assertEqual( decks.tolist(), features.randomDecks( 10, seed = 3 ).tolist() )
+        for deck in decks.tolist():
+            self.assertEqual( [*range(52)], sorted( deck ) )
+
+    def test_buried_aces(self):
+        actual = features.buriedAces( self.packed ).tolist()
+        for deck, buried in zip( self.decks, actual ):
+            expected = sum( len(cascade) - row - 1 for cascade in board.Board( deck ).cascades()
+                            for row, card in enumerate( cascade ) if board.pips( card ) == board.ace )
+            self.assertEqual( expected, buried )
+
+        #   The filter agrees at the default limit, and enough deals
+        #   are checked that a few of them are over it
+        seeds = range( 200 )
+        expected = [filters.buriedAces( board.Board( batch.shuffledDeal( seed )[1] ) ) for seed in seeds]
+        self.assertEqual( expected, ( ~features.likelySolvable( features.shuffledDecks( seeds ) ) ).tolist() )
+        self.assertEqual( { True, False, }, set( expected ) )
+
+        #   The unshuffled aces are covered by 14 cards
+        unshuffled = features.packDecks( [[*range(52)]] )
+        self.assertEqual( [14], features.buriedAces( unshuffled ).tolist() )
+        self.assertEqual( [True], features.likelySolvable( unshuffled ).tolist() )
+        self.assertEqual( [False], features.likelySolvable( unshuffled, 13 ).tolist() )
+
+    def test_inversions(self):
+        perCascade = features.inversions( self.packed, perCascade = True )
+        self.assertEqual( ( 20, 8, ), perCascade.shape )
+        self.assertEqual( perCascade.sum( axis = 1 ).tolist(), features.inversions( self.packed ).tolist() )
+
+        for row, deck in enumerate( self.decks ):
+            for c, cascade in enumerate( board.Board( deck ).cascades() ):
+                expected = sum( board.suit( under ) == board.suit( over ) and under < over
+                                for r, under in enumerate( cascade ) for over in cascade[r + 1:] )
+                self.assertEqual( expected, perCascade[row, c] )
+
+    def test_cell_pressure(self):
+        for row, deck in enumerate( self.decks ):
+            expected = 0
+            for cascade in board.Board( deck ).cascades():
+                expected += sum( not ( above == below - 1 and board.pips( below ) != board.ace )
+                                 for below, above in zip( cascade, cascade[1:] ) )
+            self.assertEqual( expected, features.cellPressure( self.packed )[row] )
+
+    def test_difficulty(self):
+        values = features.features( self.packed )
+        self.assertEqual( ['buriedAces', 'buriedLow', 'inversions', 'cellPressure'], [*values.keys()] )
+        difficulty = features.difficulty( self.packed )
+        self.assertEqual( ( 20, ), difficulty.shape )
+        self.assertTrue( ( ( 0 <= difficulty ) & ( difficulty <= 1 ) ).all() )
+
+if __name__ == '__main__':
+    unittest.main()
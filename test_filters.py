@@ -0,0 +1,27 @@
+#!/usr/bin/python3
+
+import unittest
+
+import board
+import filters
+
+from test_board import unshuffled
+
+class FiltersUnitTest(unittest.TestCase):
+
+    def test_buried_aces(self):
+        #   The unshuffled aces are covered by 14 cards
+        b = board.Board( unshuffled )
+        self.assertFalse( filters.buriedAces( b ) )
+        self.assertTrue( filters.buriedAces( b, 13 ) )
+        self.assertFalse( filters.buriedAces( b, 14 ) )
+
+    def test_reject(self):
+        b = board.Board( [*range(0,52)] )
+        expected = str( b )
+        self.assertIsNone( filters.reject( b ) )
+        self.assertEqual( 'aces', filters.reject( b, ( ( 'none', lambda b: False, ), ( 'aces', lambda b: True, ), ) ) )
+        self.assertEqual( expected, str( b ) )
+
+if __name__ == '__main__':
+    unittest.main()
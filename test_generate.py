@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+
+import collections
+import io
+import unittest
+
+import board
+import generate
+
+class GenerateUnitTest(unittest.TestCase):
+
+    def play(self, deck, solution, cells = None, cascades = None):
+        b = board.Board( deck, cells = cells, cascades = cascades )
+        for turn in solution:
+            for move in turn:
+                b.moveCard( move, True )
+        return b.solved()
+
+    def test_try_deal(self):
+        seed, deck, solution, stats = generate.tryDeal( 10 )
+        self.assertEqual( 10, seed )
+        self.assertTrue( self.play( deck, solution ) )
+        self.assertEqual( stats['nodes'], generate.tryDeal( 10 )[3]['nodes'] )
+
+        self.assertEqual( 'nodes', generate.tryDeal( 11 ) )
+        self.assertEqual( 'long', generate.tryDeal( 10, maxLength = len(solution) - 1 ) )
+        self.assertEqual( 'short', generate.tryDeal( 10, minLength = len(solution) + 1 ) )
+        self.assertEqual( 'easy', generate.tryDeal( 10, minNodes = stats['nodes'] + 1 ) )
+
+    def test_generate(self):
+        rejected = collections.Counter()
+        deals = [*generate.generateDeals( 4, seed = 10, jobs = 2, chunksize = 1, rejected = rejected )]
+        self.assertEqual( [10, 12, 15, 16], [deal[0] for deal in deals] )
+        self.assertLessEqual( 3, sum( rejected.values() ) )
+
+        #   The same deals whatever the pool
+        self.assertEqual( [deal[:3] for deal in deals], [deal[:3] for deal in generate.generateDeals( 4, seed = 10, jobs = 1 )] )
+
+    def test_run(self):
+        output = io.StringIO()
+        self.assertEqual( 2, generate.run( 2, output, seed = 10, jobs = 2, maxLength = 150 ) )
+
+        lines = output.getvalue().splitlines()
+        self.assertEqual( 2, len(lines) )
+        for line in lines:
+            seed, deck, solution, cells, cascades = generate.parseDeal( line )
+            self.assertEqual( ( 4, 8, ), ( cells, cascades, ) )
+            self.assertEqual( generate.tryDeal( seed )[:3], ( seed, deck, solution, ) )
+            self.assertTrue( self.play( deck, solution ) )
+
+    def test_run_variant(self):
+        output = io.StringIO()
+        self.assertEqual( 1, generate.run( 1, output, seed = 10, jobs = 1, cells = 3, cascades = 10 ) )
+
+        seed, deck, solution, cells, cascades = generate.parseDeal( output.getvalue() )
+        self.assertEqual( ( 3, 10, ), ( cells, cascades, ) )
+        self.assertTrue( self.play( deck, solution, cells, cascades ) )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+
+import unittest
+
+import batch
+import board
+import compact
+import ordering
+
+class OrderingUnitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.deck = batch.readDeal( 'fixtures/JS9S8C8S.txt' )[1]
+
+    def play(self, solution):
+        b = board.Board( self.deck )
+        for turn in solution:
+            for move in turn:
+                b.moveCard( move, True )
+        return b.solved()
+
+    def test_orderers(self):
+        self.assertEqual( ['moves', 'foundations', 'history'], [*ordering.orderers.keys()] )
+        self.assertIsInstance( ordering.makeOrderer( 'history' ), ordering.HistoryOrderer )
+
+    def test_move_order(self):
+        b = board.Board( self.deck )
+        expected = b.solve( lazy = False )
+        nodes = b.searchStats()['nodes']
+
+        b = board.Board( self.deck )
+        self.assertEqual( expected, b.solve( orderer = ordering.Orderer() ) )
+        self.assertEqual( nodes, b.searchStats()['nodes'] )
+
+    def test_foundations(self):
+        b = board.Board( self.deck )
+        b.moveToFoundations()
+        moves = b.enumerateMoves()
+        ordered = ordering.FoundationOrderer().order( b, moves )
+        self.assertEqual( sorted( moves ), sorted( ordered ) )
+
+        #   The best move uncovers the next card of a foundation
+        start = ordered[-1][0]
+        self.assertFalse( b.isCellIndex( start ) )
+        cascade = b.cascades()[start]
+        needed = b.cardOfIndex( b.indexOfFoundation( board.suit( cascade[-2] ) ) ) + 1
+        self.assertEqual( needed, cascade[-2] )
+
+        for layout in ( board.Board, compact.CompactBoard, ):
+            self.assertTrue( self.play( layout( self.deck ).solve( orderer = ordering.FoundationOrderer() ) ) )
+
+    def test_history(self):
+        orderer = ordering.HistoryOrderer()
+        b = board.Board( self.deck )
+        solution = b.solve( orderer = orderer )
+        self.assertTrue( self.play( solution ) )
+        self.assertEqual( len(solution) - 1, sum( orderer.counts.values() ) )
+
+        #   What it learned carries over to the next search
+        b = board.Board( self.deck )
+        self.assertTrue( self.play( b.solve( orderer = orderer ) ) )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+
+import unittest
+
+import board
+import compact
+import parallel
+
+def readDeck( filename ):
+    with open( filename, "r" ) as deckFile:
+        return board.parseDeck( deckFile.read() )
+
+def replay( deck, solution ):
+    b = board.Board( deck )
+    for turn in solution:
+        for move in turn:
+            b.moveCard( move, True )
+    return b
+
+class ParallelUnitTest(unittest.TestCase):
+
+    def test_split_root(self):
+        deck = readDeck( 'fixtures/JS9S8C8S.txt' )
+        b = board.Board( deck )
+        prefixes, solution = parallel.splitRoot( b, 2 )
+        self.assertEqual( [], solution )
+        self.assertTrue( prefixes )
+
+        #   The prefixes lead to distinct positions at the split depth
+        mementos = set()
+        for prefix in prefixes:
+            self.assertEqual( 3, len(prefix) )
+            mementos.add( replay( deck, prefix ).memento() )
+        self.assertEqual( len(prefixes), len(mementos) )
+
+        #   The board is back where it started after the automatic moves
+        expected = board.Board( deck )
+        expected.moveToFoundations()
+        self.assertEqual( str( expected ), str( b ) )
+
+    def test_split_solved(self):
+        deck = [*range(51, -1, -1)]
+        prefixes, solution = parallel.splitRoot( board.Board( deck ) )
+        self.assertEqual( [], prefixes )
+        self.assertEqual( 1, len(solution) )
+
+    def test_solve(self):
+        deck = readDeck( 'fixtures/JS9S8C8S.txt' )
+        solution = parallel.solve( deck, jobs = 2 )
+        self.assertTrue( solution )
+        self.assertTrue( replay( deck, solution ).solved() )
+
+    def test_solve_target(self):
+        deck = readDeck( 'fixtures/8H4S3H9C.txt' )
+        first = len( board.Board( deck ).solve() )
+        solution = parallel.solve( deck, jobs = 2, target = first - 10, layout = compact.CompactBoard )
+        self.assertLessEqual( len(solution), first - 10 )
+        self.assertTrue( replay( deck, solution ).solved() )
+
+    def test_solve_unsolvable(self):
+        deck = readDeck( 'fixtures/QDQSTS5H.txt' )
+        self.assertEqual( [], parallel.solve( deck, jobs = 2 ) )
+
+    def test_prefix(self):
+        #   Solving below a prefix gives solutions that start with it
+        deck = readDeck( 'fixtures/JS9S8C8S.txt' )
+        prefixes, solution = parallel.splitRoot( board.Board( deck ) )
+        for prefix in prefixes:
+            b = replay( deck, prefix )
+            solution = b.solveDepthFirst( prefix = prefix )
+            if solution:
+                self.assertEqual( prefix, solution[:len(prefix)] )
+                self.assertTrue( replay( deck, solution ).solved() )
+                break
+        self.assertTrue( solution )
+
+if __name__ == '__main__':
+    unittest.main()
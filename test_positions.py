@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+
+import os
+import tempfile
+import unittest
+
+import batch
+import board
+import positions
+
+class PositionDatabaseUnitTest(unittest.TestCase):
+
+    def play(self, deck, solution):
+        b = board.Board( deck )
+        for turn in solution:
+            for move in turn:
+                b.moveCard( move, True )
+        return b.solved()
+
+    def test_size(self):
+        self.assertEqual( 1024, positions.PositionDatabase( entries = 1500 ).capacity() )
+        self.assertEqual( 131072, positions.PositionDatabase( megabytes = 1 ).capacity() )
+
+    def test_store(self):
+        db = positions.PositionDatabase( entries = 64 )
+        key = 0x123456789ABCDEF0
+        self.assertIsNone( db.get( key ) )
+        self.assertFalse( db.isDead( key ) )
+
+        db.markSolvable( key, 7, 20 )
+        self.assertEqual( 7 << 8 | 20, db.get( key ) )
+        db.markSolvable( key, 8, 30 )
+        self.assertEqual( 7 << 8 | 20, db.get( key ) )
+        db.markSolvable( key, 9, 1000 + 10 )
+        self.assertEqual( 7 << 8 | 20, db.get( key ) )
+
+        db.markDead( key )
+        self.assertTrue( db.isDead( key ) )
+        self.assertIsNone( db.get( key ^ ( 1 << 40 ) ) )
+        self.assertEqual( 1, len(db) )
+
+    def test_move_code(self):
+        b = board.Board( batch.readDeal( 'fixtures/JS9S8C8S.txt' )[1] )
+        codes = [positions.moveCode( b, move ) for move in b.enumerateMoves()]
+        self.assertEqual( len(codes), len(set(codes)) )
+
+    def test_resolve(self):
+        deck = batch.readDeal( 'fixtures/JS9S8C8S.txt' )[1]
+        db = positions.PositionDatabase( entries = 1 << 16 )
+        first = board.Board( deck ).solve( positions = db )
+
+        b = board.Board( deck )
+        second = b.solve( positions = db )
+        self.assertEqual( len(first), len(second) )
+        self.assertTrue( self.play( deck, second ) )
+        self.assertEqual( 1, b.searchStats()['nodes'] )
+        self.assertEqual( 1, db.finishes )
+
+    def test_dead(self):
+        deck = batch.readDeal( 'fixtures/QDQSTS5H.txt' )[1]
+        db = positions.PositionDatabase( entries = 1 << 16 )
+        b = board.Board( deck )
+        self.assertFalse( b.solve( positions = db ) )
+        nodes = b.searchStats()['nodes']
+
+        b = board.Board( deck )
+        self.assertFalse( b.solve( positions = db ) )
+        self.assertLess( b.searchStats()['nodes'], nodes / 100 )
+
+    def test_limited_search_is_not_dead(self):
+        deck = batch.readDeal( 'fixtures/JS9S8C8S.txt' )[1]
+        db = positions.PositionDatabase( entries = 1 << 16 )
+        board.Board( deck ).solve( positions = db, maxNodes = 50 )
+        self.assertEqual( 37, len( board.Board( deck ).solve( positions = db ) ) )
+
+    def test_exact(self):
+        b = board.Board( [*range(52)], exact = True )
+        self.assertRaises( AssertionError, b.solve, positions = positions.PositionDatabase( entries = 64 ) )
+
+    def test_file(self):
+        deck = batch.readDeal( 'fixtures/JS9S8C8S.txt' )[1]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join( directory, 'positions.db' )
+            self.assertRaises( FileNotFoundError, positions.PositionDatabase, path, create = False )
+            with positions.PositionDatabase( path, entries = 1 << 16 ) as db:
+                board.Board( deck ).solve( positions = db )
+                used = len(db)
+            self.assertEqual( 8 << 16, os.path.getsize( path ) )
+
+            with positions.PositionDatabase( path ) as db:
+                self.assertEqual( 1 << 16, db.capacity() )
+                self.assertEqual( used, len(db) )
+                b = board.Board( deck )
+                self.assertTrue( self.play( deck, b.solve( positions = db ) ) )
+                self.assertEqual( 1, b.searchStats()['nodes'] )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+
+import unittest
+
+import batch
+import rating
+
+class RatingUnitTest(unittest.TestCase):
+
+    def test_measure(self):
+        deck = batch.readDeal( 'fixtures/JS9S8C8S.txt' )[1]
+        measures = rating.measureDeal( deck )
+        self.assertEqual( 'solved', measures['status'] )
+        self.assertEqual( 2000, measures['nodes'] )
+        self.assertEqual( 0, measures['remaining'] )
+        self.assertLessEqual( measures['length'], 37 )
+        self.assertLess( 0, measures['firstNodes'] )
+        self.assertLess( 0, measures['branching'] )
+        self.assertLessEqual( measures['cells'], measures['maxCells'] )
+        self.assertLessEqual( measures['maxCells'], 4 )
+
+        self.assertEqual( measures, rating.measureDeal( deck, layout = 'compact' ) )
+
+    def test_unsolved(self):
+        deck = batch.readDeal( 'fixtures/QDQSTS5H.txt' )[1]
+        result = rating.rateDeal( ( 'QDQSTS5H', deck, ), maxNodes = 100 )
+        self.assertEqual( 'nodes', result['status'] )
+        self.assertLess( 0, result['remaining'] )
+        self.assertNotIn( 'length', result )
+        self.assertLess( rating.rate( { 'status': 'solved', 'firstNodes': 1000, 'length': 500, 'branching': 15.0, 'cells': 4.0, } ), result['rating'] )
+
+        result = rating.rateDeal( ( 'QDQSTS5H', deck, ), maxNodes = None )
+        self.assertEqual( 'unsolvable', result['status'] )
+        self.assertIsNone( result['rating'] )
+        self.assertIsNone( result['band'] )
+
+    def test_rate(self):
+        easy = { 'status': 'solved', 'firstNodes': 50, 'length': 40, 'branching': 2.5, 'cells': 2.0, }
+        hard = { 'status': 'solved', 'firstNodes': 1500, 'length': 500, 'branching': 15.0, 'cells': 3.8, }
+        unsolved = { 'status': 'nodes', 'remaining': 50, }
+        self.assertEqual( 0, rating.rate( easy ) )
+        self.assertLess( rating.rate( easy ), rating.rate( hard ) )
+        self.assertLess( rating.rate( hard ), rating.rate( unsolved ) )
+        self.assertLessEqual( rating.rate( unsolved ), 99 )
+
+    def test_band(self):
+        self.assertEqual( 'easy', rating.band( 0 ) )
+        self.assertEqual( 'medium', rating.band( 25 ) )
+        self.assertEqual( 'expert', rating.band( 99 ) )
+        self.assertIsNone( rating.band( None ) )
+
+    def test_rate_deals(self):
+        deals = [batch.readDeal( 'fixtures/JS9S8C8S.txt' ), batch.shuffledDeal( 10 ), batch.shuffledDeal( 11 )]
+        results = [*rating.rateDeals( deals, jobs = 2, maxNodes = 500 )]
+        self.assertEqual( [deal[0] for deal in deals], [result['deal'] for result in results] )
+        self.assertEqual( rating.rateDeal( deals[1], maxNodes = 500 )['rating'], results[1]['rating'] )
+
+    def test_calibrate(self):
+        deals = [batch.shuffledDeal( seed ) for seed in range( 10, 14 )]
+        table, solved, rated = rating.calibrate( deals, jobs = 1, maxNodes = 500 )
+        self.assertEqual( 4, rated )
+        self.assertEqual( [*rating.metrics, 'score'], [*table.keys()] )
+        self.assertEqual( 99, len(table['score']) )
+        self.assertEqual( sorted( table['score'] ), table['score'] )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+#!/usr/bin/python3
+
+import unittest
+
+import board
+import table
+
+from test_board import unshuffled, no_aces, two_aces, two_aces_two
+
+class TranspositionTableUnitTest(unittest.TestCase):
+
+    def test_size(self):
+        self.assertEqual(1024, table.TranspositionTable(entries = 1500).capacity())
+        t = table.TranspositionTable(megabytes = 1)
+        self.assertEqual(65536, t.capacity())
+        self.assertLessEqual(t.nbytes(), 1024 * 1024)
+
+    def test_store(self):
+        for policy in table.TranspositionTable.policies:
+            t = table.TranspositionTable(entries = 64, policy = policy)
+            self.assertFalse(5 in t)
+            t[5] = 3
+            self.assertTrue(5 in t)
+            self.assertEqual(3, t[5])
+            self.assertEqual(3, t.get(5))
+            t[5] = 0
+            self.assertEqual(0, t[5])
+            self.assertEqual(1, len(t))
+            self.assertIsNone(t.get(5 + 64))
+            self.assertRaises(KeyError, t.__getitem__, 7)
+
+            self.assertEqual(3, t.misses)
+            self.assertEqual(2, t.stores)
+            self.assertEqual(0, t.evictions)
+
+    def test_wide_keys(self):
+        t = table.TranspositionTable(entries = 64)
+        self.assertRaises(AssertionError, t.__setitem__, 1 << 100, 2)
+
+        t = table.TranspositionTable(entries = 64, keyBits = 128)
+        self.assertEqual(18, t.entryBytes)
+        key = (1 << 100) + 17
+        t[key] = 2
+        self.assertEqual(2, t[key])
+        self.assertFalse(17 in t)
+        self.assertFalse((1 << 101) + 17 in t)
+
+    def test_clear(self):
+        t = table.TranspositionTable(entries = 64)
+        t[5] = 3
+        self.assertTrue(5 in t)
+        t.clear()
+        self.assertFalse(5 in t)
+        self.assertEqual(0, len(t))
+
+        #   The counters are only reset on request
+        self.assertEqual(1, t.hits)
+        self.assertEqual(1, t.misses)
+        self.assertEqual(1, t.stores)
+        t.resetStats()
+        self.assertEqual(0, t.hits)
+        self.assertEqual(0, t.misses)
+        self.assertEqual(0, t.stores)
+
+    def test_always(self):
+        t = table.TranspositionTable(entries = 16, policy = 'always')
+        t[1] = 1
+        t[17] = 5
+        self.assertFalse(1 in t)
+        self.assertEqual(5, t[17])
+        self.assertEqual(1, t.evictions)
+
+    def test_depth(self):
+        t = table.TranspositionTable(entries = 16, policy = 'depth')
+        t[1] = 3
+        t[17] = 5
+        self.assertEqual(3, t[1])
+        self.assertFalse(17 in t)
+        self.assertEqual(1, t.rejections)
+
+        t[33] = 2
+        self.assertEqual(2, t[33])
+        self.assertFalse(1 in t)
+        self.assertEqual(1, t.evictions)
+
+    def test_twotier(self):
+        t = table.TranspositionTable(entries = 16, policy = 'twotier')
+        t[2] = 3
+        t[18] = 5
+        self.assertEqual(3, t[2])
+        self.assertEqual(5, t[18])
+        self.assertEqual(0, t.evictions)
+
+        #   A shallower position demotes the first tier
+        t[34] = 1
+        self.assertEqual(1, t[34])
+        self.assertEqual(3, t[2])
+        self.assertFalse(18 in t)
+        self.assertEqual(1, t.evictions)
+
+        #   A deeper position replaces the second tier
+        t[50] = 7
+        self.assertEqual(1, t[34])
+        self.assertEqual(7, t[50])
+        self.assertFalse(2 in t)
+        self.assertEqual(2, t.evictions)
+
+        #   Updating the second tier keeps one copy
+        t[50] = 0
+        self.assertEqual(0, t[50])
+        self.assertEqual(2, len(t))
+
+    def assert_solve(self, deck, entries, policy, keyBits = 64):
+        setup = board.Board(deck, keyBits = keyBits)
+        visited = table.TranspositionTable(entries = entries, policy = policy, keyBits = keyBits)
+        solution = setup.solve(visited = visited)
+        self.assertTrue(solution)
+        self.assertLessEqual(len(visited), entries)
+
+        #   Replay the solution
+        replay = board.Board(deck)
+        for moves in solution:
+            for move in moves: replay.moveCard(move, True)
+        self.assertTrue(replay.solved())
+
+        return visited
+
+    def test_solve(self):
+        for policy in table.TranspositionTable.policies:
+            for deck in (no_aces, two_aces, two_aces_two,):
+                self.assert_solve(deck, 1 << 16, policy)
+
+    def test_solve_wide(self):
+        self.assert_solve(two_aces_two, 1 << 16, 'twotier', 128)
+
+    def test_solve_small(self):
+        visited = self.assert_solve(unshuffled, 1 << 12, 'twotier')
+        self.assertGreater(visited.evictions, 0)
+        self.assertGreater(len(visited), visited.capacity() // 2)
+
+if __name__ == '__main__':
+    unittest.main()